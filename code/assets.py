@@ -0,0 +1,73 @@
+from settings import *
+from support import *
+
+
+from os import walk
+
+
+# all graphics of the game - loaded once at startup and shared by every level that is created
+# the display has to exist already (surfaces are converted)
+class Assets:
+    def __init__(self):
+        # TERRAIN
+        self.land_tiles = import_folder_dict('../graphics/terrain/land')
+        # import a water tile
+        self.water_bottom = load_image('../graphics/terrain/water/water_bottom.png').convert_alpha()
+        self.water_top_animation = import_folder('../graphics/terrain/water/animation')
+
+        # COINS
+        self.gold = import_folder('../graphics/items/gold')
+        self.silver = import_folder('../graphics/items/silver')
+        self.diamond= import_folder('../graphics/items/diamond')
+        self.particle = import_folder('../graphics/items/particle')
+
+        # PALM TREES
+        # store all animations using dictionary comprehension -> walk creates a list of folder names
+        self.palms = {folder: import_folder(f'../graphics/terrain/palm/{folder}')
+                      for folder in list(walk('../graphics/terrain/palm'))[0][1]}
+
+        # ENEMIES
+        self.spike = load_image('../graphics/enemies/spikes/spikes.png').convert_alpha()
+        self.tooth = {folder: import_folder(f'../graphics/enemies/tooth/{folder}')
+                      for folder in list(walk('../graphics/enemies/tooth'))[0][1]}
+        # import only shell left and flip entire sprite when shell right is used
+        self.shell = {folder: import_folder(f'../graphics/enemies/shell_left/{folder}')
+                      for folder in list(walk('../graphics/enemies/shell_left'))[0][1]}
+        self.pearl = load_image('../graphics/enemies/pearl/pearl.png').convert_alpha()
+        # PLAYER
+        self.player_graphics = {folder: import_folder(f'../graphics/player/{folder}')
+                                for folder in list(walk('../graphics/player/'))[0][1]}
+        # CLOUD
+        self.clouds = import_folder('../graphics/clouds/')
+
+        # collision masks of every frame that needs pixel perfect collision
+        cache_masks(self.player_graphics)
+        cache_masks(self.tooth)
+        cache_masks(self.spike)
+        cache_masks(self.pearl)
+        # white versions of all player frames for the hit flash
+        cache_flash_surfaces(self.player_graphics)
+
+    # graphics a level is built from - a level never loads graphics itself
+    def level_assets(self):
+        return {
+            # land
+            'land': self.land_tiles,
+            # water
+            'water bottom': self.water_bottom,
+            'water top': self.water_top_animation,
+            # coins + particle
+            'gold': self.gold,
+            'silver': self.silver,
+            'diamond': self.diamond,
+            'particle': self.particle,
+            # palms and tree
+            'palms': self.palms,
+            # enemies & player
+            'spikes': self.spike,
+            'tooth': self.tooth,
+            'shell': self.shell,
+            'player': self.player_graphics,
+            'pearl': self.pearl,
+            'clouds': self.clouds
+        }
@@ -0,0 +1,106 @@
+from random import Random
+
+from settings import *
+
+
+# synthetic levels of any size for benchmarks
+# a layout is a dict of cells (col, row) -> tile ids (like the editor places them) plus objects (tile id, pixel pos)
+# ground is 3 tiles deep with water filled gaps, platforms, coins, enemies and palms on top
+
+# top row of the ground
+GROUND_ROW = 8
+
+
+# columns are added until the layout has at least tile_count terrain and water tiles
+def generate_layout(tile_count, seed=0):
+    random = Random(seed)
+    cells = {}
+    objects = [(0, (2 * TILE_SIZE, (GROUND_ROW - 2) * TILE_SIZE)), (1, (0, (GROUND_ROW - 1) * TILE_SIZE))]
+    tiles = 0
+    col = 0
+    while tiles < tile_count:
+        # gap filled with water - never at the start where the player spawns
+        if col > 8 and random.random() < 0.05:
+            for gap_col in range(col, col + random.randint(2, 4)):
+                for row in (GROUND_ROW + 1, GROUND_ROW + 2):
+                    cells[(gap_col, row)] = [3]
+                    tiles += 1
+            col = gap_col + 1
+            continue
+
+        for row in range(GROUND_ROW, GROUND_ROW + 3):
+            cells[(col, row)] = [2]
+            tiles += 1
+
+        # floating platform
+        if random.random() < 0.08:
+            row = random.randint(GROUND_ROW - 4, GROUND_ROW - 3)
+            for platform_col in range(col, col + random.randint(3, 6)):
+                cells.setdefault((platform_col, row), []).append(2)
+                tiles += 1
+
+        # things standing on the ground
+        if col > 4:
+            above = (col, GROUND_ROW - 1)
+            roll = random.random()
+            if roll < 0.25:
+                cells.setdefault(above, []).append(random.choice((4, 5, 6)))
+            elif roll < 0.35:
+                cells.setdefault(above, []).append(random.choice((7, 8, 9, 10)))
+            if random.random() < 0.1:
+                objects.append((random.choice((11, 12, 13, 14, 15, 16, 17, 18)),
+                                (col * TILE_SIZE, (GROUND_ROW - 3) * TILE_SIZE)))
+        col += 1
+    return cells, objects
+
+
+# level grid in the format of Editor.create_grid
+# land_tiles - names of the terrain graphics, terrain without a matching graphic uses 'X' like the editor does
+def grid_from_layout(cells, objects, land_tiles=()):
+    layers = {
+        'water': {},
+        'bg palms': {},
+        'terrain': {},
+        'enemies': {},
+        'coins': {},
+        'fg objects': {},
+    }
+    terrain = {cell for cell, tile_ids in cells.items() if 2 in tile_ids}
+    water = {cell for cell, tile_ids in cells.items() if 3 in tile_ids}
+
+    for (col, row), tile_ids in cells.items():
+        x, y = col * TILE_SIZE, row * TILE_SIZE
+        for tile_id in tile_ids:
+            style = EDITOR_DATA[tile_id]['style']
+            if style == 'terrain':
+                # neighbors in the same order Editor.check_neighbors finds them
+                name = ''.join(name for name, (dx, dy) in NEIGHBOR_DIRECTIONS.items() if (col + dx, row + dy) in terrain)
+                layers['terrain'][(x, y)] = name if name in land_tiles else 'X'
+            elif style == 'water':
+                layers['water'][(x, y)] = 'bottom' if (col, row - 1) in water else 'top'
+            elif style == 'coin':
+                layers['coins'][(x + TILE_SIZE // 2, y + TILE_SIZE // 2)] = tile_id
+            elif style == 'enemy':
+                layers['enemies'][(x, y)] = tile_id
+
+    for tile_id, pos in objects:
+        layers['bg palms' if EDITOR_DATA[tile_id]['style'] == 'palm_bg' else 'fg objects'][pos] = tile_id
+    return layers
+
+
+def generate_grid(tile_count, land_tiles=(), seed=0):
+    return grid_from_layout(*generate_layout(tile_count, seed), land_tiles)
+
+
+# place the tiles of a layout in an editor the same way clicking them in would
+def fill_editor(editor, cells):
+    # imported here so the generator works without the editor graphics
+    from editor import CanvasTile
+
+    for cell, tile_ids in cells.items():
+        for tile_id in tile_ids:
+            if cell in editor.canvas_data:
+                editor.canvas_data[cell].add_id(tile_id)
+            else:
+                editor.canvas_data[cell] = CanvasTile(tile_id)
+        editor.check_neighbors(cell)
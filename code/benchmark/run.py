@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import platform
+import pygame
+
+from time import perf_counter
+
+from headless import init_headless
+from level import Level
+from editor import Editor
+from sprites import Tooth
+from benchmark.generator import generate_layout, grid_from_layout, fill_editor
+
+# run from the code folder: python -m benchmark.run
+BASELINE_PATH = 'benchmark/baseline.json'
+RESULTS_PATH = 'benchmark/results.json'
+# slower than the baseline by more than this factor counts as a regression
+TOLERANCE = 1.1
+
+
+# level that measures how long building its sprites took
+class TimedLevel(Level):
+    def build_level(self, grid, asset_dict):
+        start = perf_counter()
+        super().build_level(grid, asset_dict)
+        self.build_time = perf_counter() - start
+
+
+# average seconds per call
+def time_calls(function, repeat):
+    start = perf_counter()
+    for _ in range(repeat):
+        function()
+    return (perf_counter() - start) / repeat
+
+
+# seconds per call of every benchmarked function for a level with about tile_count tiles
+def run_size(assets, tile_count, repeat):
+    cells, objects = generate_layout(tile_count)
+    grid = grid_from_layout(cells, objects, assets.land_tiles)
+    results = {'tiles': len(grid['terrain']) + len(grid['water'])}
+
+    level = TimedLevel(grid, lambda grid=None: None, assets.level_assets())
+    results['Level.build_level'] = level.build_time
+    # a few frames so all sprites are placed in the camera layers
+    for _ in range(3):
+        level.run(1 / 60)
+
+    results['CameraGroup.custom_draw'] = time_calls(lambda: level.all_sprites.custom_draw(level.player), repeat)
+
+    player = level.player
+
+    def player_collision():
+        player.collision('horizontal')
+        player.collision('vertical')
+    results['Player.collision'] = time_calls(player_collision, repeat) / 2
+
+    teeth = [sprite for sprite in level.all_sprites if isinstance(sprite, Tooth)]
+    if teeth:
+        def teeth_move():
+            for tooth in teeth:
+                tooth.move(1 / 60)
+        results['Tooth.move'] = time_calls(teeth_move, repeat) / len(teeth)
+
+    editor = Editor(assets.land_tiles, lambda grid=None: None)
+    fill_editor(editor, cells)
+    # neighbors of a fixed sample of cells - one call looks at the 3 x 3 cells around a cell
+    sample = list(cells)[::max(1, len(cells) // 1000)]
+
+    def check_neighbors():
+        for cell in sample:
+            editor.check_neighbors(cell)
+    results['Editor.check_neighbors'] = time_calls(check_neighbors, max(1, repeat // 10)) / len(sample)
+    results['Editor.create_grid'] = time_calls(editor.create_grid, max(1, repeat // 20))
+    return results
+
+
+# current / baseline for every measurement both have
+def compare(results, baseline):
+    comparison = {}
+    for size, measurements in results['sizes'].items():
+        base = baseline['sizes'].get(size, {})
+        comparison[size] = {name: seconds / base[name] for name, seconds in measurements.items()
+                            if name != 'tiles' and base.get(name)}
+    return comparison
+
+
+def print_table(results, comparison):
+    for size, measurements in results['sizes'].items():
+        print(f'{size} tiles requested ({measurements["tiles"]} placed)')
+        for name, seconds in measurements.items():
+            if name == 'tiles':
+                continue
+            line = f'  {name:<26} {seconds * 1000:10.4f} ms'
+            ratio = comparison.get(size, {}).get(name)
+            if ratio:
+                line += f'  {ratio:5.2f}x baseline' + ('  SLOWER' if ratio > TOLERANCE else '')
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='time level building, drawing, collision and editor functions')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='tile counts')
+    parser.add_argument('--repeat', type=int, default=100, help='calls per measurement')
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    args = parser.parse_args()
+
+    assets = init_headless()
+    results = {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'repeat': args.repeat,
+        'sizes': {str(size): run_size(assets, size, args.repeat) for size in args.sizes},
+    }
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    results['baseline'] = compare(results, baseline) if baseline else None
+    print_table(results, results['baseline'] or {})
+
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=2)
+    # regressions make the run fail (CI)
+    regressions = [(size, name) for size, ratios in (results['baseline'] or {}).items()
+                   for name, ratio in ratios.items() if ratio > TOLERANCE]
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
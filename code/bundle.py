@@ -0,0 +1,119 @@
+import json
+import mmap
+import os
+import struct
+import pygame
+
+from os import walk
+
+from settings import *
+
+# file layout: magic, index length (4 bytes little endian), index (json), pixel data
+# index: 'images' -> path inside the graphics folder -> [offset in pixel data, width, height]
+#        'folders' -> folder inside the graphics folder -> image names in the order walk lists them
+#        'sources' -> path inside the graphics folder -> [modification time (ns), size] of the image file
+# pixel data: decoded RGBA pixels of all images one after another
+MAGIC = b'PYRATBND'
+
+
+# decode every image of the graphics folder once and store the raw pixels in one file
+# run from the code folder: python bundle.py
+def build_bundle(graphics_folder=GRAPHICS_FOLDER, path=BUNDLE_PATH):
+    images = {}
+    folders = {}
+    pixel_chunks = []
+    offset = 0
+    for folder_name, sub_folders, img_files in walk(graphics_folder):
+        folder = bundle_name(folder_name, graphics_folder)
+        # same names import_folder gets from walk (including the ones of sub folders)
+        folders[folder] = [image_name for _, _, files in walk(folder_name) for image_name in files]
+        for image_name in img_files:
+            surface = pygame.image.load(os.path.join(folder_name, image_name))
+            pixels = pygame.image.tobytes(surface, 'RGBA')
+            image_path = image_name if folder == '.' else f'{folder}/{image_name}'
+            images[image_path] = [offset, surface.get_width(), surface.get_height()]
+            pixel_chunks.append(pixels)
+            offset += len(pixels)
+
+    index = json.dumps({'images': images, 'folders': folders, 'sources': source_files(graphics_folder)}).encode()
+    with open(path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(struct.pack('<I', len(index)))
+        file.write(index)
+        for pixels in pixel_chunks:
+            file.write(pixels)
+    return len(images), offset
+
+
+# path inside the graphics folder ('.' is the graphics folder itself), None for paths outside of it
+def bundle_name(path, graphics_folder=GRAPHICS_FOLDER):
+    name = os.path.relpath(os.path.normpath(path), os.path.normpath(graphics_folder))
+    if name.startswith('..'):
+        return None
+    return name.replace(os.sep, '/')
+
+
+# path inside the graphics folder -> [modification time (ns), size] of every file
+# only stats the files, so checking a bundle is cheap compared to decoding the images
+def source_files(graphics_folder=GRAPHICS_FOLDER):
+    sources = {}
+    for folder_name, _, img_files in walk(graphics_folder):
+        folder = bundle_name(folder_name, graphics_folder)
+        for image_name in img_files:
+            stat = os.stat(os.path.join(folder_name, image_name))
+            sources[image_name if folder == '.' else f'{folder}/{image_name}'] = [stat.st_mtime_ns, stat.st_size]
+    return sources
+
+
+# pre-decoded images of the graphics folder - the file is mapped into memory instead of read
+class AssetBundle:
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not an asset bundle')
+        index_start = len(MAGIC) + 4
+        index_length = struct.unpack('<I', self.data[len(MAGIC):index_start])[0]
+        index = json.loads(self.data[index_start:index_start + index_length])
+        self.images = index['images']
+        self.folders = index['folders']
+        # None for bundles written before the sources were stored
+        self.sources = index.get('sources')
+        self.pixels = memoryview(self.data)[index_start + index_length:]
+
+    # surface of an image path or None when the bundle does not have it
+    # the pixels are copied out of the mapped file - it is read only, drawing onto a surface pointing into it
+    # would crash the interpreter instead of raising an error
+    def image(self, path):
+        entry = self.images.get(bundle_name(path))
+        if not entry:
+            return None
+        offset, width, height = entry
+        pixels = self.pixels[offset:offset + width * height * 4]
+        return pygame.image.frombuffer(pixels, (width, height), 'RGBA').copy()
+
+    # image names of a folder or None when the bundle does not have it
+    def folder(self, path):
+        name = bundle_name(path)
+        return self.folders.get(name) if name is not None else None
+
+
+# bundle of the game or None - graphics are loaded from the single files then
+# a bundle that does not match the graphics folder anymore (images changed, added or removed) is not used
+# without a graphics folder the bundle is used as it is
+def open_bundle(path=BUNDLE_PATH, graphics_folder=GRAPHICS_FOLDER):
+    if not USE_ASSET_BUNDLE or not os.path.exists(path):
+        return None
+    bundle = AssetBundle(path)
+    if os.path.isdir(graphics_folder) and bundle.sources != source_files(graphics_folder):
+        print(f'{path} is out of date, loading the images from {graphics_folder} - rebuild it with: python bundle.py')
+        return None
+    return bundle
+
+
+asset_bundle = open_bundle()
+
+
+if __name__ == '__main__':
+    count, size = build_bundle()
+    print(f'{count} images, {size / 1024 / 1024:.1f} MB of pixels written to {BUNDLE_PATH}')
@@ -0,0 +1,70 @@
+import pygame
+
+from settings import *
+from random import randint, random
+
+# cloud surfaces list -> the same surfaces scaled by 2, so scaling happens once and not on every spawn
+scaled_surfaces = {}
+
+
+def scale_cloud_surfaces(surfaces):
+    if id(surfaces) not in scaled_surfaces:
+        # keep the original list alive together with its scaled version so the id stays unique
+        scaled_surfaces[id(surfaces)] = (surfaces, [pygame.transform.scale2x(surf) for surf in surfaces])
+    return scaled_surfaces[id(surfaces)][1]
+
+
+# moving clouds for the level and the editor
+# a fixed amount of clouds is stored in plain lists - clouds leaving on the left are reused on the right
+class CloudLayer:
+    # count - amount of clouds
+    # start_range - x range the clouds are spread across when the layer is created
+    # spawn_range - x range reused clouds are placed in again
+    # left_limit - clouds further left are reused
+    # height_range - height above the horizon
+    # speed_range - pixels per second to the left
+    # scale_chance - chance of a cloud using the scaled surface
+    def __init__(self, surfaces, count, start_range, spawn_range, left_limit,
+                 height_range, speed_range, scale_chance):
+        self.surfaces = surfaces
+        self.scaled_surfaces = scale_cloud_surfaces(surfaces)
+        self.spawn_range = spawn_range
+        self.left_limit = left_limit
+        self.height_range = height_range
+        self.speed_range = speed_range
+        self.scale_chance = scale_chance
+
+        # cloud records - one entry per cloud in each list
+        self.x = [0] * count
+        self.height = [0] * count
+        self.speed = [0] * count
+        self.images = [None] * count
+        for index in range(count):
+            self.spawn(index, randint(*start_range))
+
+    # (re)place a cloud with a new look, height and speed
+    def spawn(self, index, x):
+        index_surface = randint(0, len(self.surfaces) - 1)
+        self.images[index] = self.scaled_surfaces[index_surface] if random() < self.scale_chance \
+            else self.surfaces[index_surface]
+        self.x[index] = x
+        self.height[index] = randint(*self.height_range)
+        self.speed[index] = randint(*self.speed_range)
+
+    def update(self, dt):
+        # move all clouds in one step
+        self.x = [x - speed * dt for x, speed in zip(self.x, self.speed)]
+        # reuse clouds that moved out on the left side
+        if self.x and min(self.x) <= self.left_limit:
+            for index, x in enumerate(self.x):
+                if x <= self.left_limit:
+                    self.spawn(index, randint(*self.spawn_range))
+
+    # add all clouds inside the window to a blit batch
+    # offset_x - horizontal camera offset, horizon_y - horizon position on the screen
+    def draw(self, batch, offset_x, horizon_y):
+        for x, height, image in zip(self.x, self.height, self.images):
+            x -= offset_x
+            y = horizon_y - height
+            if x < WINDOW_WIDTH and y < WINDOW_HEIGHT and x + image.get_width() > 0 and y + image.get_height() > 0:
+                batch.add(image, (x, y))
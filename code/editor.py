@@ -2,15 +2,15 @@ import pygame, sys
 from pygame.math import Vector2 as vector
 from pygame.mouse import get_pressed as mouse_buttons
 from pygame.mouse import get_pos as mouse_position
-from pygame.image import load
 
 from settings import *
 from support import *
 
 from menu import Menu
 from timer import Timer
-
-from random import choice, randint
+from render import DirtyRects, BlitBatch, horizon_cache
+from clouds import CloudLayer
+from profiler import profiler
 
 
 class Editor:
@@ -26,16 +26,19 @@ class Editor:
         self.import_tile()
 
         # clouds
-        # create empty list of clouds
-        self.current_clouds = []
         # import cloud images
         self.cloud_surfaces = import_folder('../graphics/clouds')
-        # create a timer for drawing clouds
-        self.cloud_timer = pygame.USEREVENT + 1
-        # timer every 2 sec
-        pygame.time.set_timer(self.cloud_timer, 2000)
-        # create some clouds to have them already when game starts
-        self.startup_clouds()
+        # clouds start spread across the window and are reused once they leave it on the left
+        self.clouds = CloudLayer(
+            surfaces=self.cloud_surfaces,
+            count=EDITOR_CLOUD_COUNT,
+            start_range=(0, WINDOW_WIDTH),
+            spawn_range=(WINDOW_WIDTH + 50, WINDOW_WIDTH + 100),
+            left_limit=-400,
+            # clouds should move up and down following the horizon
+            height_range=(0, WINDOW_HEIGHT),
+            speed_range=(20, 50),
+            scale_chance=2 / 5)
 
         # navigation / vector imported by pygame.math
         self.origin = vector()
@@ -70,6 +73,12 @@ class Editor:
         # timer object to prevent multiple placing objects when button is pressed
         self.object_timer = Timer(400)
 
+        # window areas that change while the editor is idle (clouds, animations, preview)
+        self.dirty_rects = DirtyRects()
+        # batched drawing - terrain only changes on input, animated tiles and clouds change every frame
+        self.tile_batch = BlitBatch(self.display_surface)
+        self.animation_batch = BlitBatch(self.display_surface, self.dirty_rects)
+
         # Player
         # Position 0 to use player
         CanvasObject(
@@ -146,9 +155,9 @@ class Editor:
     # import tiles
     def import_tile(self):
         # import water
-        self.water_bottom = load('../graphics/terrain/water/water_bottom.png').convert_alpha()
+        self.water_bottom = load_image('../graphics/terrain/water/water_bottom.png').convert_alpha()
         # import sky
-        self.sky_handle_surface = load('../graphics/cursors/handle.png').convert_alpha()
+        self.sky_handle_surface = load_image('../graphics/cursors/handle.png').convert_alpha()
 
         # animation import
         # no sprites are used here because of performance reasons
@@ -164,7 +173,7 @@ class Editor:
                     'length': len(graphics)
                 }
         # preview tiles using dictionary comprehension for 'preview' type
-        self.preview_surfaces = {key: load(value['preview']) for key, value in EDITOR_DATA.items() if value['preview']}
+        self.preview_surfaces = {key: load_image(value['preview']) for key, value in EDITOR_DATA.items() if value['preview']}
 
     # updates the frame for animation
     def animation_update(self, dt):
@@ -249,15 +258,37 @@ class Editor:
 
         return layers
 
+    # amount of placed tiles and objects (profiler overlay)
+    def group_counts(self):
+        return {
+            'canvas tiles': len(self.canvas_data),
+            'canvas objects': len(self.canvas_objects),
+        }
+
+    # blits issued by the tile and animation batches since the last call (frame trace)
+    def blits_issued(self):
+        batches = (self.tile_batch, self.animation_batch)
+        count = sum(batch.blit_count for batch in batches)
+        for batch in batches:
+            batch.blit_count = 0
+        return count
+
     # INPUT
     def event_loop(self):
+        # holding a mouse button paints, removes, drags or pans -> anything on the canvas could change
+        if any(mouse_buttons()):
+            self.dirty_rects.invalidate()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
+            # every input besides moving the mouse could change the whole canvas
+            if event.type != pygame.MOUSEMOTION:
+                self.dirty_rects.invalidate()
                 # if enter was pressed switch to game mode and call transition
             if event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN:
                 self.switch(self.create_grid())
+            profiler.handle_event(event)
             self.pan_input(event)
             # call selection index key behavior
             self.selection_hotkeys(event)
@@ -269,8 +300,6 @@ class Editor:
             self.canvas_add()
             # method to remove tiles
             self.canvas_remove()
-            # create the clouds
-            self.create_clouds(event)
 
     def pan_input(self, event):
         # middle mouse button was pressed or released
@@ -438,12 +467,12 @@ class Editor:
                 terrain_string = ''.join(tile.terrain_neighbors)
                 # safeguard if a graphic is missing use placeholder / joker which fits everywhere
                 terrain_style = terrain_string if terrain_string in self.land_tiles else 'X'
-                self.display_surface.blit(self.land_tiles[terrain_style], pos)
+                self.tile_batch.add(self.land_tiles[terrain_style], pos)
 
             # water
             if tile.has_water:
                 if tile.water_on_top:
-                    self.display_surface.blit(self.water_bottom, pos)
+                    self.tile_batch.add(self.water_bottom, pos)
                 else:
                     # separate the frames ( index is always 3 )
                     frames = self.animations[3]['frames']
@@ -451,7 +480,7 @@ class Editor:
                     index = int(self.animations[3]['frame index'])
                     # create surface from index
                     surface = frames[index]
-                    self.display_surface.blit(surface, pos)
+                    self.animation_batch.add(surface, pos)
 
             # coins
             if tile.coin:
@@ -461,7 +490,7 @@ class Editor:
                 # place the coins in the middle of the cell not at the top left
                 rect = surface.get_rect(center=(pos[0] + TILE_SIZE // 2, pos[1] + TILE_SIZE // 2))
 
-                self.display_surface.blit(surface, rect)
+                self.animation_batch.add(surface, rect)
 
             # enemies
             if tile.enemy:
@@ -471,9 +500,15 @@ class Editor:
                 # place the enemy in the middle and bottom of the cell
                 rect = surface.get_rect(midbottom=(pos[0] + TILE_SIZE // 2, pos[1] + TILE_SIZE))
 
-                self.display_surface.blit(surface, rect)
+                self.animation_batch.add(surface, rect)
+        # static tiles first, animated tiles (water, coins, enemies) on top of them
+        self.tile_batch.flush()
+        self.animation_batch.flush()
         # draw objects (player, trees at the canvas
         self.foreground.draw(self.display_surface)
+        # objects are animated and change their size with every frame
+        for sprite in self.canvas_objects:
+            self.dirty_rects.add(sprite.rect.copy())
 
     # show a preview of the selected tile or object
     def preview(self):
@@ -485,6 +520,8 @@ class Editor:
             if selected_object:
                 # create a rectangle copy of selected object, inflate it to draw lines around it
                 rect = selected_object.rect.inflate(10, 10)
+                # lines are drawn on the border of the rectangle
+                self.dirty_rects.add(rect.inflate(6, 6))
                 # color of lines
                 color = 'black'
                 # width of lines
@@ -527,7 +564,7 @@ class Editor:
                 # object
                 else:
                     rect = surface.get_rect(center=mouse_position())
-                self.display_surface.blit(surface, rect)
+                self.dirty_rects.add(self.display_surface.blit(surface, rect))
 
     # SKY
 
@@ -539,69 +576,32 @@ class Editor:
 
         # horizon lines
         if y_pos > 0:
-            horizon_rect1 = pygame.Rect(0, y_pos - 10, WINDOW_WIDTH, 10)
-            horizon_rect2 = pygame.Rect(0, y_pos - 16, WINDOW_WIDTH, 4)
-            horizon_rect3 = pygame.Rect(0, y_pos - 20, WINDOW_WIDTH, 2)
-
-            pygame.draw.rect(self.display_surface, HORIZON_TOP_COLOR, horizon_rect1)
-            pygame.draw.rect(self.display_surface, HORIZON_TOP_COLOR, horizon_rect2)
-            pygame.draw.rect(self.display_surface, HORIZON_TOP_COLOR, horizon_rect3)
+            horizon_cache.draw_band(self.display_surface, y_pos)
 
             # cloud drawing
             self.display_cloud(dt, y_pos)
 
         # fill the display with water when no sky is visible
         if 0 < y_pos < WINDOW_HEIGHT:
-            # sea - rectangle placed below the horizon line
-            sea_rect = pygame.Rect(0, y_pos, WINDOW_WIDTH, WINDOW_HEIGHT)
-            pygame.draw.rect(self.display_surface, SEA_COLOR, sea_rect)
-            pygame.draw.line(self.display_surface, HORIZON_COLOR, (0, y_pos), (WINDOW_WIDTH, y_pos), 3)
+            # sea - placed below the horizon line
+            horizon_cache.draw_sea(self.display_surface, y_pos)
         if y_pos < 0:
-            self.display_surface.fill(SEA_COLOR)
+            horizon_cache.draw_underwater(self.display_surface)
 
     # drawing the clouds
     def display_cloud(self, dt, y_pos):
-        # clouds currently existing
-        for cloud in self.current_clouds:  # [{surf, pos, speed}]
-            cloud['pos'][0] -= cloud['speed'] * dt
-            x = cloud['pos'][0]
-            # clouds should move up and down following the horizon
-            y = y_pos - cloud['pos'][1]
-            self.display_surface.blit(cloud['surface'], (x, y))
-
-    def create_clouds(self, event):
-        # only create when timer runs
-        if event.type == self.cloud_timer:
-            # choose one of the existing clouds with choice by random
-            surface = choice(self.cloud_surfaces)
-            # scale the clouds by 2 to create difference, but only at random occurrences
-            surface = pygame.transform.scale2x(surface) if randint(0, 4) < 2 else surface
-            # a list of x,y coords for position of clouds - random
-            pos = [WINDOW_WIDTH + randint(50, 100), randint(0, WINDOW_HEIGHT)]
-            # random speed of cloud movement
-            speed = randint(20, 50)
-            # create a random list of clouds
-            self.current_clouds.append({'surface': surface, 'pos': pos, 'speed': speed})
-
-            # limit amount of clouds created, to not crash performance when game runs longer
-            self.current_clouds = [cloud for cloud in self.current_clouds if cloud['pos'][0] > -400]
-
-    # initiate clouds directly so there no need to wait for them to appear
-    def startup_clouds(self):
-        # create 20 clouds
-        for i in range(20):
-            surface = pygame.transform.scale2x(
-                choice(self.cloud_surfaces)) if randint(0, 4) < 2 else choice(self.cloud_surfaces)
-            pos = [randint(0, WINDOW_WIDTH), randint(0, WINDOW_HEIGHT)]
-            speed = randint(20, 50)
-            self.current_clouds.append({'surface': surface, 'pos': pos, 'speed': speed})
+        self.clouds.update(dt)
+        self.clouds.draw(self.animation_batch, 0, y_pos)
+        self.animation_batch.flush()
 
     # UPDATE
     def run(self, dt):
         self.event_loop()
+        profiler.mark('event loop')
 
         # updating
         self.animation_update(dt)
+        profiler.mark('animation_update')
         self.canvas_objects.update(dt)
         self.object_timer.update()
 
@@ -609,16 +609,25 @@ class Editor:
         self.display_surface.fill('grey')
         # display sky first as this is in the background
         self.display_sky(dt)
+        profiler.mark('objects + sky')
         # draw the level
         self.draw_level()
+        profiler.mark('draw_level')
         # draw lines for grid
         self.draw_tile_lines()
+        profiler.mark('draw_tile_lines')
         # draw origin position
         # pygame.draw.circle(self.display_surface, 'red', self.origin, 10)
         # draw preview of selected object
         self.preview()
+        profiler.mark('preview')
         # draw menu
         self.menu.display(self.selection_index)
+        self.dirty_rects.add(self.menu.rect)
+        profiler.mark('menu.display')
+
+        # returns the changed window areas (None -> whole window)
+        return self.dirty_rects.collect()
 
 
 # class / object to store all information stored inside tiles
@@ -0,0 +1,50 @@
+import json
+import os
+
+from collections import deque
+from time import perf_counter, strftime
+
+from settings import *
+
+
+# frame by frame record of phase spans and counters for offline analysis
+# written in the chrome trace event format (chrome://tracing, ui.perfetto.dev) or as json lines
+# only the last TRACE_BUFFER_SIZE events are kept, so a recording can run for hours
+class TraceRecorder:
+    # start_time - perf_counter time the trace starts at (now if not given)
+    def __init__(self, start_time=None):
+        # ('span', name, start, end) or ('counter', name, time, values) - converted when written
+        self.events = deque(maxlen=TRACE_BUFFER_SIZE)
+        self.start_time = perf_counter() if start_time is None else start_time
+
+    # a phase that ran from start to end (perf_counter seconds)
+    def span(self, name, start, end):
+        self.events.append(('span', name, start, end))
+
+    # values of one counter track at a point in time - values: series name -> number
+    def counter(self, name, time, values):
+        self.events.append(('counter', name, time, values))
+
+    # trace events in microseconds since the recording started
+    def trace_events(self):
+        for kind, name, time, value in self.events:
+            timestamp = (time - self.start_time) * 1e6
+            if kind == 'span':
+                yield {'name': name, 'ph': 'X', 'ts': timestamp, 'dur': (value - time) * 1e6, 'pid': 0, 'tid': 0}
+            else:
+                yield {'name': name, 'ph': 'C', 'ts': timestamp, 'pid': 0, 'args': value}
+
+    # write the buffer to a file - returns the path
+    # TRACE_FORMAT 'chrome' -> one json document, 'jsonl' -> one event per line
+    def save(self, path=None):
+        if not path:
+            os.makedirs(TRACE_FOLDER, exist_ok=True)
+            extension = 'jsonl' if TRACE_FORMAT == 'jsonl' else 'json'
+            path = os.path.join(TRACE_FOLDER, f'trace_{strftime("%Y%m%d_%H%M%S")}.{extension}')
+        with open(path, 'w') as file:
+            if path.endswith('.jsonl'):
+                for event in self.trace_events():
+                    file.write(json.dumps(event) + '\n')
+            else:
+                json.dump({'traceEvents': list(self.trace_events()), 'displayTimeUnit': 'ms'}, file)
+        return path
@@ -0,0 +1,146 @@
+import os
+
+# no window - has to be set before pygame opens the display
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+# the result is printed as json, nothing else should end up on stdout
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import json
+import pygame
+import random
+import sys
+
+import timer
+
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from settings import *
+from assets import Assets
+from level import Level
+
+
+# pressed keys for the player read from a script instead of the keyboard
+# can be used as key source of a level (returns itself like pygame.key.get_pressed returns the key states)
+class ScriptedInput:
+    # script - (frame, key names) pairs, the keys are held from that frame on until the next pair
+    def __init__(self, script=()):
+        self.script = sorted(((frame, {pygame.key.key_code(name) for name in names}) for frame, names in script),
+                             key=lambda step: step[0])
+        self.pressed = set()
+
+    # pick the keys held in a frame
+    def set_frame(self, frame):
+        for start, keys in self.script:
+            if start > frame:
+                break
+            self.pressed = keys
+
+    def __call__(self):
+        return self
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+
+# time that only moves on when a frame is simulated - timers (cooldowns, invulnerability) do not depend
+# on how long a frame really took - with the same seed every run of a level and script gives the same result
+class SimulatedClock:
+    def __init__(self):
+        self.milliseconds = 0
+
+    def advance(self, dt):
+        self.milliseconds += dt * 1000
+
+    def __call__(self):
+        return int(self.milliseconds)
+
+
+# level grid from a json file - same layers as Editor.create_grid, positions are written as "x,y"
+def load_grid(path):
+    with open(path) as file:
+        data = json.load(file)
+    return {layer: {tuple(int(value) for value in pos.split(',')): tile for pos, tile in tiles.items()}
+            for layer, tiles in data.items()}
+
+
+# display and graphics without a window
+def init_headless():
+    pygame.init()
+    pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    return Assets()
+
+
+# build a level from a grid and run it for a number of frames with a fixed frame time
+# draw - False only runs the simulation
+# seed - random numbers (e.g. the start direction of the teeth) are the same in every run
+# returns the timings and where the player ended up
+def run_headless(grid, frames, dt=1 / 60, script=(), draw=True, assets=None, seed=0):
+    assets = assets or init_headless()
+    keys = ScriptedInput(script)
+    clock = SimulatedClock()
+    timer.time_source = clock
+    random.seed(seed)
+
+    # the clock is global - timers of the rest of the process go back to real time even if the level fails
+    try:
+        start = perf_counter()
+        level = Level(grid, lambda grid=None: None, assets.level_assets(), keys)
+        build_time = perf_counter() - start
+
+        start = perf_counter()
+        for frame in range(frames):
+            keys.set_frame(frame)
+            clock.advance(dt)
+            level.run(dt, draw)
+        run_time = perf_counter() - start
+    finally:
+        timer.time_source = pygame.time.get_ticks
+
+    return {
+        'frames': frames,
+        'dt': dt,
+        'draw': draw,
+        'seed': seed,
+        'build seconds': build_time,
+        'run seconds': run_time,
+        'frames per second': frames / run_time if run_time else 0,
+        'player': list(level.player.rect.topleft),
+        'sprites': len(level.all_sprites),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='run a level without a window')
+    parser.add_argument('grid', help='level grid as json (layer -> {"x,y": tile})')
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--dt', type=float, default=1 / 60, help='frame time in seconds')
+    parser.add_argument('--script', help='json list of [frame, [key names]] - keys held from that frame on')
+    parser.add_argument('--no-draw', action='store_true', help='only run the simulation')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random numbers')
+    parser.add_argument('--output', help='json file for the result (printed when not given)')
+    args = parser.parse_args()
+
+    grid = load_grid(args.grid)
+    script = []
+    if args.script:
+        with open(args.script) as file:
+            script = json.load(file)
+    output = os.path.abspath(args.output) if args.output else None
+    # graphics are loaded relative to the code folder
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    # messages of the game go to stderr so stdout only carries the result
+    with redirect_stdout(sys.stderr):
+        results = run_headless(grid, args.frames, args.dt, script, not args.no_draw, seed=args.seed)
+
+    if output:
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -5,20 +5,39 @@ from settings import *
 from support import *
 
 from sprites import *
-from random import choice, randint
+from spatial import SpatialHash, SpatialGroup
+from occupancy import OccupancyGrid
+from render import DirtyRects, BlitBatch, horizon_cache
+from clouds import CloudLayer
+from profiler import profiler
+from random import uniform
 
 class Level:
     # constructor
-    def __init__(self, grid, switch, asset_dict):
+    # key_source - function returning the pressed keys for the player, keyboard when None (scripted input)
+    def __init__(self, grid, switch, asset_dict, key_source=None):
         self.display_surface = pygame.display.get_surface()
         self.switch = switch
+        self.key_source = key_source
 
         # groups of sprites - basic sprite group
         self.all_sprites = CameraGroup()
-        self.coin_sprites = pygame.sprite.Group()
-        self.damage_sprites = pygame.sprite.Group()
-        self.collision_sprites = pygame.sprite.Group()
+        # coins never move - stored once in a spatial hash, picked up coins are removed from it
+        self.coin_sprites = SpatialGroup()
+        # damage sprites are looked up around the player - teeth and pearls are re-bucketed when they move
+        self.damage_sprites = SpatialGroup()
+        # collision sprites are looked up by area (spatial hash with tile sized cells)
+        self.collision_sprites = SpatialGroup()
         self.shell_sprites = pygame.sprite.Group()
+        # solid sprites that are not terrain tiles (palm blocks, shells)
+        self.obstacle_sprites = SpatialGroup()
+
+        # short-lived sprites are reused instead of created for every coin pickup / shot
+        self.particle_pool = SpritePool(Particle)
+        self.pearl_pool = SpritePool(Pearl)
+
+        # shared frame indices for animated sprites using the same frames (water, palms, coins)
+        self.animation_clocks = AnimationClocks()
 
         # when level is created
         self.build_level(grid, asset_dict)
@@ -34,28 +53,49 @@ class Level:
         }
 
         # ADDITIONAL stuff - support variables
+        # damage checks of the last frame - broadphase candidates vs pixel mask tests
+        self.damage_stats = {'candidates': 0, 'mask tests': 0}
+        # time of the frames that was not simulated yet (less than one step)
+        self.accumulator = 0
         self.particle_surfs = asset_dict['particle']
-        # store cloud surface
-        self.cloud_surfs = asset_dict['clouds']
-        # create a new type of event
-        self.cloud_timer = pygame.USEREVENT + 2
-        # create a cloud every 2 seconds
-        pygame.time.set_timer(self.cloud_timer, 2000)
-        self.startup_clouds()
+        # clouds - amount depends on the level width so long levels are not empty and short ones not crowded
+        level_width = self.level_limits['right'] - self.level_limits['left']
+        self.clouds = CloudLayer(
+            surfaces=asset_dict['clouds'],
+            count=max(LEVEL_CLOUD_MIN, level_width // LEVEL_CLOUD_SPACING),
+            start_range=(self.level_limits['left'], self.level_limits['right']),
+            spawn_range=(self.level_limits['right'] + 100, self.level_limits['right'] + 300),
+            left_limit=self.level_limits['left'],
+            # create cloud on top of horizon by default
+            # as these are behind the horizon an offset is needed
+            height_range=(-50, 600),
+            speed_range=(20, 30),
+            scale_chance=1 / 3)
+        self.all_sprites.clouds = self.clouds
 
     # build the level - loading layers and graphics
     def build_level(self, grid, asset_dict):
+        # which tiles are solid - used for point checks of enemies and the floor check of the player
+        self.solid_map = OccupancyGrid(grid['terrain'].keys(), self.obstacle_sprites)
+        # terrain collision - neighboring tiles are merged into big rectangles (no seams between tiles)
+        terrain_rects = self.solid_map.merged_rects()
+        for rect in terrain_rects:
+            TerrainCollider(rect, self.collision_sprites)
+        # collision rectangles per terrain tile - lower is better
+        self.collision_reduction = len(terrain_rects) / len(grid['terrain']) if grid['terrain'] else 1
+
         # go through all layers
         for layer_name, layer in grid.items():
             for pos, data in layer.items():
                 if layer_name == 'terrain':
-                    # create a generic sprite
-                    Generic(pos, asset_dict['land'][data],
-                            [self.all_sprites, self.collision_sprites])
+                    # create a generic sprite - only for drawing, collision uses merged rectangles
+                    Generic(pos, asset_dict['land'][data], self.all_sprites)
                 if layer_name == 'water':
                     if data == 'top':
                         # create animated sprite
-                        Animated(asset_dict['water top'], pos, self.all_sprites, LEVEL_LAYERS['water'])
+                        # all water tops share the same frame so the waves stay seamless
+                        Animated(asset_dict['water top'], pos, self.all_sprites, LEVEL_LAYERS['water'],
+                                 clock=self.animation_clocks.get(asset_dict['water top']))
                     else:
                         # create plain water sprite
                         Generic(pos, asset_dict['water bottom'], self.all_sprites, LEVEL_LAYERS['water'])
@@ -65,7 +105,8 @@ class Level:
 
                     # player object
                     case 0:
-                        self.player = Player(pos, asset_dict['player'], self.all_sprites, self.collision_sprites)
+                        self.player = Player(pos, asset_dict['player'], self.all_sprites, self.collision_sprites,
+                                             self.solid_map, self.key_source)
 
                     # SKY
 
@@ -79,91 +120,143 @@ class Level:
                     # gold
                     case 4:
                         Coin('gold', asset_dict['gold'], pos,
-                             [self.all_sprites, self.coin_sprites])
+                             [self.all_sprites, self.coin_sprites], **self.animation_timing(asset_dict['gold']))
                     # silver
                     case 5:
                         Coin('silver', asset_dict['silver'], pos,
-                             [self.all_sprites, self.coin_sprites])
+                             [self.all_sprites, self.coin_sprites], **self.animation_timing(asset_dict['silver']))
                     # diamond
                     case 6:
                         Coin('diamond', asset_dict['diamond'], pos,
-                             [self.all_sprites, self.coin_sprites])
+                             [self.all_sprites, self.coin_sprites], **self.animation_timing(asset_dict['diamond']))
 
                     # ENEMIES
 
                     # spikes
                     case 7:
                         Spikes(asset_dict['spikes'], pos, [self.all_sprites, self.damage_sprites])
-                    # tooth - needs to know collision items but is not in that group
+                    # tooth - needs to know solid tiles but is not in that group
                     case 8:
                         Tooth(asset_dict['tooth'], pos, [self.all_sprites, self.damage_sprites],
-                              self.collision_sprites)
+                              self.solid_map)
                     # shell pointing left
                     case 9:
                         Shell(
                             orientation='left',
                             assets=asset_dict['shell'],
                             pos=pos,
-                            group=[self.all_sprites, self.collision_sprites, self.shell_sprites],
+                            group=[self.all_sprites, self.collision_sprites, self.obstacle_sprites, self.shell_sprites],
                             pearl_surf=asset_dict['pearl'],
-                            damage_sprites = self.damage_sprites)
+                            damage_sprites = self.damage_sprites,
+                            pearl_pool = self.pearl_pool)
                     # shell pointing right
                     case 10:
                         Shell(
                             orientation='right',
                             assets=asset_dict['shell'],
                             pos=pos,
-                            group=[self.all_sprites, self.collision_sprites, self.shell_sprites],
+                            group=[self.all_sprites, self.collision_sprites, self.obstacle_sprites, self.shell_sprites],
                             pearl_surf=asset_dict['pearl'],
-                            damage_sprites = self.damage_sprites)
+                            damage_sprites = self.damage_sprites,
+                            pearl_pool = self.pearl_pool)
 
                     # player in range?
                     # PALMS
 
                     # palms foreground -> block size attribute for movement
                     case 11:
-                        Animated(asset_dict['palms']['small_fg'], pos, self.all_sprites)
-                        Block(pos, (80, 10), self.collision_sprites)
+                        Animated(asset_dict['palms']['small_fg'], pos, self.all_sprites,
+                                 **self.animation_timing(asset_dict['palms']['small_fg']))
+                        Block(pos, (80, 10), [self.collision_sprites, self.obstacle_sprites])
                     case 12:
-                        Animated(asset_dict['palms']['large_fg'], pos, self.all_sprites)
-                        Block(pos, (80, 10), self.collision_sprites)
+                        Animated(asset_dict['palms']['large_fg'], pos, self.all_sprites,
+                                 **self.animation_timing(asset_dict['palms']['large_fg']))
+                        Block(pos, (80, 10), [self.collision_sprites, self.obstacle_sprites])
                     case 13:
-                        Animated(asset_dict['palms']['left_fg'], pos, self.all_sprites)
-                        Block(pos, (80, 10), self.collision_sprites)
+                        Animated(asset_dict['palms']['left_fg'], pos, self.all_sprites,
+                                 **self.animation_timing(asset_dict['palms']['left_fg']))
+                        Block(pos, (80, 10), [self.collision_sprites, self.obstacle_sprites])
                     case 14:
-                        Animated(asset_dict['palms']['right_fg'], pos, self.all_sprites)
-                        Block(pos + vector(50, 0), (80, 10), self.collision_sprites)
+                        Animated(asset_dict['palms']['right_fg'], pos, self.all_sprites,
+                                 **self.animation_timing(asset_dict['palms']['right_fg']))
+                        Block(pos + vector(50, 0), (80, 10), [self.collision_sprites, self.obstacle_sprites])
                     # palms background - no collision
                     case 15:
-                        Animated(asset_dict['palms']['small_bg'], pos, self.all_sprites, LEVEL_LAYERS['bg'])
+                        Animated(asset_dict['palms']['small_bg'], pos, self.all_sprites, LEVEL_LAYERS['bg'],
+                                 **self.animation_timing(asset_dict['palms']['small_bg']))
                     case 16:
-                        Animated(asset_dict['palms']['large_bg'], pos, self.all_sprites, LEVEL_LAYERS['bg'])
+                        Animated(asset_dict['palms']['large_bg'], pos, self.all_sprites, LEVEL_LAYERS['bg'],
+                                 **self.animation_timing(asset_dict['palms']['large_bg']))
                     case 17:
-                        Animated(asset_dict['palms']['left_bg'], pos, self.all_sprites, LEVEL_LAYERS['bg'])
+                        Animated(asset_dict['palms']['left_bg'], pos, self.all_sprites, LEVEL_LAYERS['bg'],
+                                 **self.animation_timing(asset_dict['palms']['left_bg']))
                     case 18:
-                        Animated(asset_dict['palms']['right_bg'], pos, self.all_sprites, LEVEL_LAYERS['bg'])
+                        Animated(asset_dict['palms']['right_bg'], pos, self.all_sprites, LEVEL_LAYERS['bg'],
+                                 **self.animation_timing(asset_dict['palms']['right_bg']))
 
         for sprite in self.shell_sprites:
             sprite.player = self.player
 
+        # terrain and bottom water never change -> draw them into a few big surfaces once
+        self.all_sprites.bake_static_tiles()
+        # index all coins now instead of on the first pickup check
+        self.coin_sprites.store_new_sprites()
+
+    # shared clock and frame offset for an animated sprite
+    def animation_timing(self, frames):
+        clock = self.animation_clocks.get(frames)
+        # random offset so identical tiles next to each other do not animate in sync
+        phase = uniform(0, clock.length) if ANIMATION_PHASE_OFFSETS else 0
+        return {'clock': clock, 'phase': phase}
+
     # method for "picking up" coins by player - also handle particle effect
     def get_coins(self):
+        # only coins in the cells under the player are checked
+        collided_coins = self.coin_sprites.overlapping(self.player.rect)
         # make sure coins are removed when picked up by player
-        collided_coins = pygame.sprite.spritecollide(self.player, self.coin_sprites, True)
+        for sprite in collided_coins:
+            sprite.kill()
         # particle effect when coin was picked up
         for sprite in collided_coins:
-            Particle(self.particle_surfs, sprite.rect.center, self.all_sprites)
+            self.particle_pool.get(self.particle_surfs, sprite.rect.center, self.all_sprites)
             # use this if statement for increase gold amount or other functions
             if sprite.coin_type == 'gold':
                 print('gold')
 
     # checks for mask collision
+    # only sprites near the player are checked, only overlapping ones get the pixel perfect mask test
     def get_damage(self):
-        collision_sprites = pygame.sprite.spritecollide(self.player, self.damage_sprites,
-                                                        False, pygame.sprite.collide_mask)
-        # if there is something inside the collection a collision occured
-        if collision_sprites:
-            self.player.damage()
+        candidates = self.damage_sprites.nearby(self.player.rect)
+        mask_tests = 0
+        for sprite in candidates:
+            if sprite.rect.colliderect(self.player.rect):
+                mask_tests += 1
+                # if the masks overlap a collision occurred
+                if pygame.sprite.collide_mask(self.player, sprite):
+                    self.player.damage()
+                    break
+        # numbers of the last frame for profiling
+        self.damage_stats['candidates'] = len(candidates)
+        self.damage_stats['mask tests'] = mask_tests
+
+    # amount of sprites in each group (profiler overlay)
+    def group_counts(self):
+        return {
+            'all sprites': len(self.all_sprites),
+            'active sprites': sum(self.all_sprites.active_counts.values()),
+            'collision sprites': len(self.collision_sprites),
+            'damage sprites': len(self.damage_sprites),
+            'coin sprites': len(self.coin_sprites),
+            'shell sprites': len(self.shell_sprites),
+        }
+
+    # blits issued by the camera since the last call (frame trace)
+    def blits_issued(self):
+        batches = (self.all_sprites.chunk_batch, self.all_sprites.sprite_batch)
+        count = sum(batch.blit_count for batch in batches)
+        for batch in batches:
+            batch.blit_count = 0
+        return count
 
     # loop for actualisation inside the level
     def event_loop(self):
@@ -175,46 +268,50 @@ class Level:
                 # if escape was pressed inside the level -> switch to editor mode calling transition
             if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                 self.switch()
+            profiler.handle_event(event)
+
+    # one simulation step of dt seconds
+    def simulate(self, dt):
+        self.animation_clocks.update(dt)
+        self.clouds.update(dt)
+        # re-bucket collision sprites that moved
+        self.collision_sprites.refresh()
+        self.obstacle_sprites.refresh()
+        profiler.mark('clocks + refresh')
+        # only sprites near the player are updated
+        self.all_sprites.update(dt, self.player)
+        profiler.mark('all_sprites.update')
+        self.damage_sprites.refresh()
+        self.get_coins()
+        profiler.mark('get_coins')
+        self.get_damage()
+        profiler.mark('get_damage')
 
-            # cloud creation
-            if event.type == self.cloud_timer:
-                # pick random surface from clouds
-                surf = choice(self.cloud_surfs)
-                # scale clouds randomly
-                surf = pygame.transform.scale2x(surf) if randint(0, 5) > 3 else surf
-                x = self.level_limits['right'] + randint(100, 300)
-                # create cloud on top of horizon by default
-                # as these are behind the horizon an offset is needed
-                y = self.horizon_y - randint(-50, 600)
-                # create cloud object
-                Cloud((x, y), surf, self.all_sprites, self.level_limits['left'])
-
-    # cloud creation
-    def startup_clouds(self):
-        for i in range(40):
-            # pick random surface from clouds
-            surf = choice(self.cloud_surfs)
-            # scale clouds randomly
-            surf = pygame.transform.scale2x(surf) if randint(0, 5) > 3 else surf
-            x = randint(self.level_limits['left'], self.level_limits['right'])
-            # create cloud on top of horizon by default
-            # as these are behind the horizon an offset is needed
-            y = self.horizon_y - randint(-50, 600)
-            # create cloud object
-            Cloud((x, y), surf, self.all_sprites, self.level_limits['left'])
-
-    def run(self, dt):
+    # draw - False only simulates (headless runs), nothing is drawn and None is returned
+    def run(self, dt, draw=True):
         # update part
         self.event_loop()
-        self.all_sprites.update(dt)
-        self.get_coins()
-        self.get_damage()
+        profiler.mark('event loop')
+        if FIXED_TIMESTEP:
+            # simulate the frame time in steps of the same length, the rest is kept for the next frame
+            self.accumulator += min(dt, MAX_FRAME_TIME)
+            while self.accumulator >= SIMULATION_STEP:
+                self.simulate(SIMULATION_STEP)
+                self.accumulator -= SIMULATION_STEP
+            # how far the next step is along - moving sprites are drawn that far between their last 2 positions
+            alpha = self.accumulator / SIMULATION_STEP if RENDER_INTERPOLATION else 1
+        else:
+            self.simulate(dt)
+            alpha = 1
+        if not draw:
+            return None
 
         # drawing part
         self.display_surface.fill(SKY_COLOR)
         # self.all_sprites.draw(self.display_surface)
         # everything should be drawn related to player
-        self.all_sprites.custom_draw(self.player)
+        # returns the changed window areas (None -> whole window)
+        return self.all_sprites.custom_draw(self.player, alpha)
 
 
 # class for camera movement and grouping objects
@@ -225,6 +322,181 @@ class CameraGroup(pygame.sprite.Group):
         self.display_surface = pygame.display.get_surface()
         # vector influence the offset of all drawn objects (should be relative to player)
         self.offset = vector()
+        # clouds are not sprites - the level hands its cloud layer over
+        self.clouds = None
+
+        # layers - every layer is a bucket holding a spatial index of its sprites in level coordinates
+        # sorted by layer value -> the order the layers are drawn in (clouds, ocean, bg, water, main)
+        self.layers = {z: SpatialHash(CAMERA_CELL_SIZE) for z in sorted(LEVEL_LAYERS.values())}
+        # sprite -> number in which it was added, keeps the draw order inside a layer
+        self.draw_order = {}
+        self.added_count = 0
+        # sprites added since the last frame - z and rect are set after a sprite joined its groups
+        self.new_sprites = []
+        # sprites that move around and have to be re-bucketed every frame
+        self.moving_sprites = {}
+        # pre-rendered static tiles - one spatial index of chunks per layer
+        self.chunk_layers = {z: SpatialHash(CHUNK_SIZE * TILE_SIZE) for z in self.layers}
+        # amount of sprites that were skipped in the last frame (outside window + margin)
+        self.culled_count = 0
+        # window areas sprites were drawn to - static chunks and horizon only change when the camera moves
+        self.dirty_rects = DirtyRects()
+        # batched drawing - chunks do not change while the camera stands still, sprites might
+        self.chunk_batch = BlitBatch(self.display_surface)
+        self.sprite_batch = BlitBatch(self.display_surface, self.dirty_rects)
+
+        # simulation level of detail - sprites far away from the player are not updated
+        # time simulated so far, sprite -> simulated time it was last updated at
+        self.simulation_time = 0
+        self.last_updates = {}
+        self.last_sleep_update = 0
+        # sprites updated no matter where they are (player)
+        self.always_active = set()
+        # class name -> amount of sprites, class name -> amount of sprites updated in the last frame
+        self.class_counts = {}
+        self.active_counts = {}
+
+        # render interpolation - moving sprite -> (step, position before that step)
+        self.step_count = 0
+        self.previous_positions = {}
+        # fraction of a step the drawn positions are between the previous and the current one
+        self.alpha = 1
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.draw_order[sprite] = self.added_count
+        self.added_count += 1
+        self.new_sprites.append(sprite)
+        name = type(sprite).__name__
+        self.class_counts[name] = self.class_counts.get(name, 0) + 1
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        del self.draw_order[sprite]
+        # sprites killed before their first frame were never placed in a layer
+        if hasattr(sprite, 'z'):
+            self.layers[sprite.z].remove(sprite)
+        self.moving_sprites.pop(sprite, None)
+        self.last_updates.pop(sprite, None)
+        self.previous_positions.pop(sprite, None)
+        self.always_active.discard(sprite)
+        self.class_counts[type(sprite).__name__] -= 1
+
+    # place new sprites in their layer
+    # moving sprites are re-bucketed in update after they moved
+    def update_layers(self):
+        for sprite in self.new_sprites:
+            # sprite could already be killed again (e.g. tooth without floor)
+            if sprite in self.draw_order:
+                self.layers[sprite.z].insert(sprite, sprite.rect)
+                # a sprite that starts outside of the active area catches up from the moment it was placed
+                self.last_updates[sprite] = self.simulation_time
+                if sprite.moving:
+                    self.moving_sprites[sprite] = self.layers[sprite.z]
+                if sprite.always_active:
+                    self.always_active.add(sprite)
+        self.new_sprites = []
+
+    # sprites updated in this frame - the ones around the player (window + margin) and the always active ones
+    # every SLEEP_UPDATE_INTERVAL seconds all sprites are updated so sleeping ones can catch up
+    def active_sprites(self, player):
+        if not SIMULATION_LOD:
+            return self.sprites()
+        if SLEEP_UPDATE_INTERVAL and self.simulation_time - self.last_sleep_update >= SLEEP_UPDATE_INTERVAL:
+            self.last_sleep_update = self.simulation_time
+            return self.sprites()
+        active_rect = pygame.Rect(0, 0, WINDOW_WIDTH + SIMULATION_MARGIN * 2, WINDOW_HEIGHT + SIMULATION_MARGIN * 2)
+        active_rect.center = player.rect.center
+        active = set(self.always_active)
+        for layer in self.layers.values():
+            active.update(layer.query(active_rect))
+        # same update order as the group
+        return sorted(active, key=self.draw_order.__getitem__)
+
+    # update the sprites near the player - sprites that were sleeping catch up on the time they missed
+    def update(self, dt, player):
+        self.update_layers()
+        previous_time = self.simulation_time
+        self.simulation_time += dt
+        self.step_count += 1
+        active_counts = {}
+        for sprite in self.active_sprites(player):
+            # sprite could be killed by a sprite updated before it
+            if sprite not in self.draw_order:
+                continue
+            if sprite in self.moving_sprites:
+                self.previous_positions[sprite] = (self.step_count, sprite.rect.topleft)
+            last_update = self.last_updates.get(sprite, previous_time)
+            # sprites driven by a shared clock (animated tiles) only read its state - one update is enough
+            if last_update == previous_time or getattr(sprite, 'clock', None):
+                sprite.update(dt)
+            else:
+                self.catch_up(sprite, min(self.simulation_time - last_update, SLEEP_MAX_CATCH_UP))
+            self.last_updates[sprite] = self.simulation_time
+            if sprite in self.moving_sprites:
+                self.moving_sprites[sprite].move(sprite, sprite.rect)
+            name = type(sprite).__name__
+            active_counts[name] = active_counts.get(name, 0) + 1
+        self.active_counts = active_counts
+
+    # update a sprite in small steps so it does not skip over walls or ledges
+    def catch_up(self, sprite, elapsed):
+        while elapsed > 0 and sprite in self.draw_order:
+            step = min(elapsed, SLEEP_CATCH_UP_STEP)
+            sprite.update(step)
+            elapsed -= step
+
+    # class name -> (updated sprites, sleeping sprites) of the last frame
+    def activity_counts(self):
+        return {name: (self.active_counts.get(name, 0), count - self.active_counts.get(name, 0))
+                for name, count in self.class_counts.items() if count}
+
+    # render all plain Generic sprites (terrain, bottom water) into chunk surfaces
+    # the baked tiles leave the camera group, so they are neither drawn nor updated one by one anymore
+    # animated and moving sprites are subclasses of Generic and stay on the normal path
+    def bake_static_tiles(self):
+        chunk_pixels = CHUNK_SIZE * TILE_SIZE
+        # (z, chunk col, chunk row) -> tiles inside that chunk in draw order
+        chunks = {}
+        for sprite in sorted(self.new_sprites, key=self.draw_order.__getitem__):
+            if type(sprite) is Generic and sprite in self.draw_order:
+                key = (sprite.z, sprite.rect.x // chunk_pixels, sprite.rect.y // chunk_pixels)
+                chunks.setdefault(key, []).append(sprite)
+
+        for (z, col, row), sprites in chunks.items():
+            # tiles could stick out of the chunk area, so the chunk covers all of its tiles
+            chunk_rect = sprites[0].rect.unionall([sprite.rect for sprite in sprites])
+            surf = pygame.Surface(chunk_rect.size, pygame.SRCALPHA)
+            for sprite in sprites:
+                surf.blit(sprite.image, (sprite.rect.x - chunk_rect.x, sprite.rect.y - chunk_rect.y))
+                self.remove(sprite)
+            # chunk sprite without any group - only used for drawing
+            chunk = Generic(chunk_rect.topleft, surf, [], z)
+            self.chunk_layers[z].insert(chunk, chunk.rect)
+
+    # top left position a sprite is drawn at
+    # sprites that moved in the last step are drawn between their old and new position
+    def render_position(self, sprite):
+        previous = self.previous_positions.get(sprite)
+        if previous is None or previous[0] != self.step_count or self.alpha == 1:
+            return sprite.rect.topleft
+        (previous_x, previous_y), alpha = previous[1], self.alpha
+        return (previous_x + (sprite.rect.x - previous_x) * alpha,
+                previous_y + (sprite.rect.y - previous_y) * alpha)
+
+    # draws all sprites of one layer inside the window (+ margin) in the order they were added
+    def draw_layer(self, z, view_rect):
+        offset_x, offset_y = self.offset
+        # static chunks are at the bottom of their layer
+        for chunk in self.chunk_layers[z].query(view_rect):
+            self.chunk_batch.add(chunk.image, (chunk.rect.x - offset_x, chunk.rect.y - offset_y))
+        self.chunk_batch.flush()
+        visible = sorted(self.layers[z].query(view_rect), key=self.draw_order.__getitem__)
+        for sprite in visible:
+            x, y = self.render_position(sprite)
+            self.sprite_batch.add(sprite.image, (x - offset_x, y - offset_y))
+        self.sprite_batch.flush()
+        return len(visible)
 
     # draw the horizon / sky
     def draw_horizon(self):
@@ -234,48 +506,49 @@ class CameraGroup(pygame.sprite.Group):
         # check if horizon is somewhere below window height
         # normal level
         if horizon_pos < WINDOW_HEIGHT:
-            sea_rect = pygame.Rect(0, horizon_pos, WINDOW_WIDTH, WINDOW_HEIGHT - horizon_pos)
-            pygame.draw.rect(self.display_surface, SEA_COLOR, sea_rect)
-            # horizon line
-            # 3 extra rectangles
-            horizon_rect1 = pygame.Rect(0, horizon_pos - 10, WINDOW_WIDTH, 10)
-            horizon_rect2 = pygame.Rect(0, horizon_pos - 16, WINDOW_WIDTH, 4)
-            horizon_rect3 = pygame.Rect(0, horizon_pos - 20, WINDOW_WIDTH, 2)
-
-            pygame.draw.rect(self.display_surface, HORIZON_TOP_COLOR, horizon_rect1)
-            pygame.draw.rect(self.display_surface, HORIZON_TOP_COLOR, horizon_rect2)
-            pygame.draw.rect(self.display_surface, HORIZON_TOP_COLOR, horizon_rect3)
-
-            pygame.draw.line(self.display_surface, HORIZON_COLOR,
-                             (0, horizon_pos), (WINDOW_WIDTH, horizon_pos),
-                             3)
+            # horizon line with 3 extra rectangles and the sea below
+            horizon_cache.draw_band(self.display_surface, horizon_pos)
+            horizon_cache.draw_sea(self.display_surface, horizon_pos)
 
         # check if horizon is somewhere over window height
         # underwater level
         if horizon_pos < 0:
-            self.display_surface.fill(SEA_COLOR)
+            horizon_cache.draw_underwater(self.display_surface)
 
-    def custom_draw(self, player):
+    # alpha - how far the simulation is between the last step and the next one (1 -> draw the current positions)
+    def custom_draw(self, player, alpha=1):
+        self.alpha = alpha
         # relative to player offset positioning - "camera" follows player movement
-        self.offset.x = player.rect.centerx - WINDOW_WIDTH / 2
-        self.offset.y = player.rect.centery - WINDOW_HEIGHT / 2
+        # camera follows the drawn player position so the player does not jitter on screen
+        previous_offset = self.offset.copy()
+        player_x, player_y = self.render_position(player)
+        self.offset.x = player_x + player.rect.width // 2 - WINDOW_WIDTH / 2
+        self.offset.y = player_y + player.rect.height // 2 - WINDOW_HEIGHT / 2
+        # scrolling changes the whole window
+        if self.offset != previous_offset:
+            self.dirty_rects.invalidate()
+
+        self.update_layers()
+        # window area in level coordinates + margin
+        view_rect = pygame.Rect(self.offset.x, self.offset.y, WINDOW_WIDTH, WINDOW_HEIGHT)
+        view_rect.inflate_ip(CULL_MARGIN * 2, CULL_MARGIN * 2)
+        drawn_count = 0
 
         # draw clouds in background of horizon first
-        for sprite in self:
-            if sprite.z == LEVEL_LAYERS['clouds']:
-                offset_rect = sprite.rect.copy()
-                offset_rect.center -= self.offset
-                self.display_surface.blit(sprite.image, offset_rect)
+        if self.clouds:
+            self.clouds.draw(self.sprite_batch, self.offset.x, self.horizon_y - self.offset.y)
+        drawn_count += self.draw_layer(LEVEL_LAYERS['clouds'], view_rect)
 
+        profiler.mark('sprite draw')
         # draw horizon second
         self.draw_horizon()
+        profiler.mark('horizon')
+
+        # draw all other layers on top of the horizon (ocean, bg, water, main)
+        for z in self.layers:
+            if z != LEVEL_LAYERS['clouds']:
+                drawn_count += self.draw_layer(z, view_rect)
 
-        # draw all other elements that are not clouds
-        for sprite in self:
-            for layer in LEVEL_LAYERS.values():
-                if sprite.z == layer and sprite.z != LEVEL_LAYERS['clouds']:
-                    # create a copy of the object rect to use it for offset
-                    offset_rect = sprite.rect.copy()
-                    # use for offset
-                    offset_rect.center -= self.offset
-                    self.display_surface.blit(sprite.image, offset_rect)
+        self.culled_count = len(self.draw_order) - drawn_count
+        profiler.mark('sprite draw')
+        return self.dirty_rects.collect()
@@ -2,22 +2,23 @@ import pygame
 from pygame.math import Vector2 as vector
 
 from settings import *
-from support import *
-
-# import load function to load images
-from pygame.image import load
+from support import load_image
 
 from editor import Editor
 from level import Level
-
-from os import walk
+from pacing import FramePacer
+from assets import Assets
+from profiler import profiler
 
 
 class Main:
     def __init__(self):
         pygame.init()
-        self.display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-        self.clock = pygame.time.Clock()
+        # vsync only works with a scaled (or OpenGL) window
+        self.display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT),
+                                                       pygame.SCALED if VSYNC else 0, vsync=int(VSYNC))
+        # frame rate limit - the editor slows down when idle
+        self.pacer = FramePacer()
         self.imports()
 
         # check if editor is active to switch between editor and level updater
@@ -25,51 +26,27 @@ class Main:
         # transition object when switching between level and editor mode
         self.transition = Transition(self.toggle)
         self.editor = Editor(self.land_tiles, self.switch)
+        # created when switching to the level mode
+        self.level = None
+        profiler.on_recording_start = self.reset_blit_counters
 
         # mouse cursor replacement
         # load image which should replace cursor
-        surface = (load
-                   ("/home/brot/Documents/Projects/Phyton/Pyrat_Platformer/graphics/cursors/mouse.png").convert_alpha())
+        surface = load_image('../graphics/cursors/mouse.png').convert_alpha()
         # clickable area (1 para) is top coord of cursor which interacts when clicked / rest of cursor is just graphic
         cursor = pygame.cursors.Cursor((0, 0), surface)
         pygame.mouse.set_cursor(cursor)
 
-    # import the terrain tiles used for level creation
+    # import the graphics used for level creation
     def imports(self):
-        # TERRAIN
-        self.land_tiles = import_folder_dict('../graphics/terrain/land')
-        # import a water tile
-        self.water_bottom = load('../graphics/terrain/water/water_bottom.png').convert_alpha()
-        self.water_top_animation = import_folder('../graphics/terrain/water/animation')
-
-        # COINS
-        self.gold = import_folder('../graphics/items/gold')
-        self.silver = import_folder('../graphics/items/silver')
-        self.diamond= import_folder('../graphics/items/diamond')
-        self.particle = import_folder('../graphics/items/particle')
-
-        # PALM TREES
-        # store all animations using dictionary comprehension -> walk creates a list of folder names
-        self.palms = {folder: import_folder(f'../graphics/terrain/palm/{folder}')
-                      for folder in list(walk('../graphics/terrain/palm'))[0][1]}
-
-        # ENEMIES
-        self.spike = load('../graphics/enemies/spikes/spikes.png').convert_alpha()
-        self.tooth = {folder: import_folder(f'../graphics/enemies/tooth/{folder}')
-                      for folder in list(walk('../graphics/enemies/tooth'))[0][1]}
-        # import only shell left and flip entire sprite when shell right is used
-        self.shell = {folder: import_folder(f'../graphics/enemies/shell_left/{folder}')
-                      for folder in list(walk('../graphics/enemies/shell_left'))[0][1]}
-        self.pearl = load('../graphics/enemies/pearl/pearl.png').convert_alpha()
-        # PLAYER
-        self.player_graphics = {folder: import_folder(f'../graphics/player/{folder}')
-                                for folder in list(walk('../graphics/player/'))[0][1]}
-        # CLOUD
-        self.clouds = import_folder('../graphics/clouds/')
+        self.assets = Assets()
+        # the editor needs the terrain tiles too
+        self.land_tiles = self.assets.land_tiles
 
     # switch editor on and off helper method
     def toggle(self):
         self.editor_active = not self.editor_active
+        profiler.reset()
 
     # call transition of game modes
     def switch(self, grid = None):
@@ -80,41 +57,59 @@ class Main:
             # Level object needs to know switch status
             # create a new level everytime a switch happens
             # to not load every graphic on its on pass in a dictionary
-            self.level = Level(grid, self.switch, {
-                # land
-                'land': self.land_tiles,
-                # water
-                'water bottom': self.water_bottom,
-                'water top': self.water_top_animation,
-                # coins + particle
-                'gold': self.gold,
-                'silver': self.silver,
-                'diamond': self.diamond,
-                'particle': self.particle,
-                # palms and tree
-                'palms': self.palms,
-                # enemies & player
-                'spikes': self.spike,
-                'tooth': self.tooth,
-                'shell': self.shell,
-                'player': self.player_graphics,
-                'pearl': self.pearl,
-                'clouds': self.clouds
-            })
+            self.level = Level(grid, self.switch, self.assets.level_assets())
 
     def run(self):
         while True:
-            dt = self.clock.tick() / 1000
+            # level and transitions always run at the target frame rate
+            dt = self.pacer.tick(busy=not self.editor_active or self.transition.active)
+            profiler.begin_frame()
 
             # run editor only on editor mode
+            # both modes return the window areas they changed (None -> whole window)
             if self.editor_active:
-                self.editor.run(dt)
+                dirty_rects = self.editor.run(dt)
             else:
                 # run level mode
-                self.level.run(dt)
+                dirty_rects = self.level.run(dt)
             # do transition when change happens
-            self.transition.display(dt)
-            pygame.display.update()
+            transition_rects = self.transition.display(dt)
+            profiler.mark('transition')
+            # profiler overlay on top of everything (or the area it covered after it got hidden)
+            overlay_rect = profiler.draw(self.display_surface, self.editor.group_counts() if self.editor_active
+                                         else self.level.group_counts()) if profiler.enabled else profiler.hidden_rect()
+            if overlay_rect and transition_rects is not None:
+                transition_rects = transition_rects + [overlay_rect]
+            profiler.mark('profiler')
+            # push only the changed areas to the display if possible
+            if DIRTY_RECTS and dirty_rects is not None and transition_rects is not None:
+                pygame.display.update(dirty_rects + transition_rects)
+            else:
+                pygame.display.update()
+            profiler.mark('display flip')
+            profiler.end_frame()
+            if profiler.recording:
+                self.record_counters()
+
+    # blits are counted all the time - forget the ones issued before a recording started
+    def reset_blit_counters(self):
+        self.editor.blits_issued()
+        if self.level:
+            self.level.blits_issued()
+
+    # numbers of the frame for the trace recording
+    def record_counters(self):
+        mode = self.editor if self.editor_active else self.level
+        profiler.record_counters('sprites', mode.group_counts())
+        profiler.record_counters('blits', {'issued': mode.blits_issued()})
+        if not self.editor_active:
+            profiler.record_counters('collision candidates', {
+                'player': self.level.player.collision_candidates,
+                'damage': self.level.damage_stats['candidates'],
+                'damage mask tests': self.level.damage_stats['mask tests'],
+            })
+        profiler.record_counters('transition', {'active': int(self.transition.active),
+                                                'border width': self.transition.border_width})
 
 
 # Transition object class to make switch between editor and level smoother
@@ -132,6 +127,7 @@ class Transition:
         # make sure the whole window is filled - acts as a reverse point
         self.threshold = self.radius + 100
 
+    # returns the window areas it changed - the circle covers the whole window while active
     def display(self, dt):
         # if transition happens
         if self.active:
@@ -151,6 +147,8 @@ class Transition:
                 self.direction = 1
             # draw border in defined direction (open - close)
             pygame.draw.circle(self.display_surface, 'black', self.center, self.radius, int(self.border_width))
+            return None
+        return []
 
 
 if __name__ == '__main__':
@@ -1,6 +1,6 @@
 import pygame
 from settings import *
-from pygame.image import load
+from support import load_image
 
 
 class Menu:
@@ -20,11 +20,11 @@ class Menu:
             if value['menu']:
                 if not value['menu'] in self.menu_surfaces:
                     # if there is no previous entry create a new collection
-                    # [(key, load(value['menu_surf']))] creates a tuple of key, value pair
-                    self.menu_surfaces[value['menu']] = [(key, load(value['menu_surf']))]
+                    # [(key, load_image(value['menu_surf']))] creates a tuple of key, value pair
+                    self.menu_surfaces[value['menu']] = [(key, load_image(value['menu_surf']))]
                 else:
                     # if there is already a matching entry append the next to this collection
-                    self.menu_surfaces[value['menu']].append((key, load(value['menu_surf'])))
+                    self.menu_surfaces[value['menu']].append((key, load_image(value['menu_surf'])))
 
     def create_buttons(self):
         # create menu area
@@ -0,0 +1,125 @@
+import pygame
+
+from settings import *
+
+
+# which parts of the level are solid - one byte per terrain tile plus a group of smaller obstacles
+# (palm blocks, shells) that do not fit the tile grid
+# answers point and area checks without looking at every collision sprite
+class OccupancyGrid:
+    # tile_positions - top left pixel positions of the solid tiles (keys of the terrain layer)
+    # obstacles - spatial group of solid sprites that are not terrain tiles
+    def __init__(self, tile_positions, obstacles, tile_size=TILE_SIZE):
+        self.tile_size = tile_size
+        self.obstacles = obstacles
+
+        cells = [(int(x) // tile_size, int(y) // tile_size) for x, y in tile_positions]
+        # grid only covers the area with tiles in it
+        self.left = min((col for col, row in cells), default=0)
+        self.top = min((row for col, row in cells), default=0)
+        self.cols = max((col for col, row in cells), default=-1) - self.left + 1
+        self.rows = max((row for col, row in cells), default=-1) - self.top + 1
+        # row by row, 1 -> solid
+        self.tiles = bytearray(self.cols * self.rows)
+        for col, row in cells:
+            self.tiles[(row - self.top) * self.cols + col - self.left] = 1
+
+    # greedy merge of neighboring solid tiles into as few rectangles as possible (level pixel coordinates)
+    # runs of tiles in a row are grown downwards as long as the rows below have the same run
+    def merged_rects(self):
+        size = self.tile_size
+        used = bytearray(len(self.tiles))
+        rects = []
+        for row in range(self.rows):
+            col = 0
+            while col < self.cols:
+                index = row * self.cols + col
+                if not self.tiles[index] or used[index]:
+                    col += 1
+                    continue
+                # widest run to the right
+                width = 1
+                while col + width < self.cols and self.tiles[index + width] and not used[index + width]:
+                    width += 1
+                # grow downwards while the whole run is solid and free
+                height = 1
+                while row + height < self.rows:
+                    start = (row + height) * self.cols + col
+                    if all(self.tiles[start:start + width]) and not any(used[start:start + width]):
+                        height += 1
+                    else:
+                        break
+                for merged_row in range(row, row + height):
+                    start = merged_row * self.cols + col
+                    used[start:start + width] = b'\x01' * width
+                rects.append(pygame.Rect((col + self.left) * size, (row + self.top) * size,
+                                         width * size, height * size))
+                col += width
+        return rects
+
+    # is there a terrain tile at a tile position
+    def is_solid_tile(self, col, row):
+        col -= self.left
+        row -= self.top
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return self.tiles[row * self.cols + col] == 1
+        return False
+
+    # is a single pixel solid
+    def is_solid(self, point):
+        x, y = int(point[0]), int(point[1])
+        if self.is_solid_tile(x // self.tile_size, y // self.tile_size):
+            return True
+        return bool(self.obstacles.overlapping(pygame.Rect(x, y, 1, 1)))
+
+    # does an area touch anything solid
+    def overlaps_solid(self, rect):
+        size = self.tile_size
+        for col in range(rect.left // size, (rect.right - 1) // size + 1):
+            for row in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                if self.is_solid_tile(col, row):
+                    return True
+        return bool(self.obstacles.overlapping(rect))
+
+    # distance from a point to the first solid pixel to the left (direction -1) or right (direction 1)
+    # returns None when nothing solid is within max_distance
+    def raycast_horizontal(self, point, direction, max_distance):
+        x, y = int(point[0]), int(point[1])
+        distance = self.tile_raycast(x, y // self.tile_size, direction, max_distance, horizontal=True)
+        # obstacles inside the covered stretch can be closer
+        ray = pygame.Rect(x if direction > 0 else x - max_distance, y, max_distance + 1, 1)
+        for sprite in self.obstacles.overlapping(ray):
+            edge = sprite.rect.left - x if direction > 0 else x - (sprite.rect.right - 1)
+            edge = max(edge, 0)
+            if distance is None or edge < distance:
+                distance = edge
+        return distance
+
+    # distance from a point to the first solid pixel above (direction -1) or below (direction 1)
+    def raycast_vertical(self, point, direction, max_distance):
+        x, y = int(point[0]), int(point[1])
+        distance = self.tile_raycast(y, x // self.tile_size, direction, max_distance, horizontal=False)
+        ray = pygame.Rect(x, y if direction > 0 else y - max_distance, 1, max_distance + 1)
+        for sprite in self.obstacles.overlapping(ray):
+            edge = sprite.rect.top - y if direction > 0 else y - (sprite.rect.bottom - 1)
+            edge = max(edge, 0)
+            if distance is None or edge < distance:
+                distance = edge
+        return distance
+
+    # walks tile by tile along a row or column
+    # start - pixel position along the ray, line - row (horizontal) or column (vertical) of the ray
+    def tile_raycast(self, start, line, direction, max_distance, horizontal):
+        size = self.tile_size
+        cell = start // size
+        last_cell = (start + direction * max_distance) // size
+        while True:
+            solid = self.is_solid_tile(cell, line) if horizontal else self.is_solid_tile(line, cell)
+            if solid:
+                # distance to the edge of the tile facing the start point
+                edge = cell * size if direction > 0 else cell * size + size - 1
+                distance = max((edge - start) * direction, 0)
+                return distance if distance <= max_distance else None
+            if cell == last_cell:
+                return None
+            cell += direction
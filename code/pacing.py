@@ -0,0 +1,32 @@
+import pygame
+
+from settings import *
+
+
+# limits the frame rate of the main loop and slows it down while nothing happens
+# full speed in level mode, during transitions and as soon as there is input again
+class FramePacer:
+    def __init__(self):
+        self.clock = pygame.time.Clock()
+        # time of the last frame with input or something else going on (milliseconds)
+        self.last_activity = pygame.time.get_ticks()
+        self.idle = False
+
+    # wait for the next frame and return the frame time in seconds
+    # busy - something is moving that needs the full frame rate (level, transition)
+    def tick(self, busy):
+        now = pygame.time.get_ticks()
+        # events are only looked at, they stay in the queue for the editor / level
+        if busy or pygame.event.peek():
+            self.last_activity = now
+        self.idle = IDLE_THROTTLING and now - self.last_activity >= IDLE_DELAY * 1000
+
+        if self.idle and IDLE_WAIT_EVENTS:
+            # sleep until an event arrives - put it back so the event loop still gets it
+            event = pygame.event.wait(IDLE_WAIT_TIMEOUT)
+            if event.type != pygame.NOEVENT:
+                pygame.event.post(event)
+                self.last_activity = pygame.time.get_ticks()
+                self.idle = False
+            return self.clock.tick() / 1000
+        return self.clock.tick(IDLE_FPS if self.idle else TARGET_FPS) / 1000
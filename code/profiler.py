@@ -0,0 +1,197 @@
+import atexit
+import pygame
+
+from collections import deque
+from time import perf_counter
+
+from settings import *
+from frame_trace import TraceRecorder
+
+# key that shows / hides the overlay
+TOGGLE_KEY = pygame.K_F3
+# key that starts / stops recording a trace
+RECORD_KEY = pygame.K_F4
+# upper limits (milliseconds) of the frame time histogram bars - the last bar takes everything above
+HISTOGRAM_LIMITS = (4, 8, 16.7, 33.3, 66.7)
+
+
+# frame profiler - time spent in each phase of the last frames, shown as an overlay in the top left corner
+# phases are measured with marks: a mark books the time since the previous mark onto its phase
+# while the overlay is hidden and nothing is recorded marks only check a flag
+class Profiler:
+    def __init__(self):
+        # overlay shown
+        self.enabled = False
+        # trace recording - phases and counters of every frame are also stored in a recorder
+        self.recorder = None
+        # measuring at all (overlay or recording)
+        self.active = False
+        # called when a recording starts (e.g. to reset counters that ran while nothing was recorded)
+        self.on_recording_start = None
+        # a running recording is written when the game is closed
+        atexit.register(self.stop_on_exit)
+        # (frame time, phase -> seconds) of the last frames
+        self.history = deque(maxlen=PROFILER_HISTORY)
+        self.phases = {}
+        self.frame_start = 0
+        self.last_mark = 0
+        # overlay is only rendered again every PROFILER_REFRESH frames
+        self.surface = None
+        self.frames_since_render = 0
+        self.font = None
+        # window area of the last drawn overlay - has to be updated once more after the overlay got hidden
+        self.last_rect = None
+
+    def toggle(self):
+        if not self.active:
+            self.restart_frame()
+        self.enabled = not self.enabled
+        self.active = self.enabled or self.recording
+        self.reset()
+
+    @property
+    def recording(self):
+        return self.recorder is not None
+
+    def start_recording(self):
+        if not self.active:
+            self.restart_frame()
+        # the trace starts with the current frame, so no span begins before it
+        self.recorder = TraceRecorder(self.frame_start)
+        self.active = True
+        if self.on_recording_start:
+            self.on_recording_start()
+
+    # stop recording and write the trace - returns the path of the file
+    def stop_recording(self, path=None):
+        path = self.recorder.save(path)
+        self.recorder = None
+        self.active = self.enabled
+        return path
+
+    def stop_on_exit(self):
+        if self.recording:
+            print('trace written to', self.stop_recording())
+
+    # counter values of the current frame - values: series name -> number
+    def record_counters(self, name, values):
+        if self.recorder:
+            self.recorder.counter(name, perf_counter(), values)
+
+    # forget the stored frames (level and editor have different phases)
+    def reset(self):
+        self.history.clear()
+        self.surface = None
+
+    # called by the event loops of the level and the editor
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN and event.key == TOGGLE_KEY:
+            self.toggle()
+        if event.type == pygame.KEYDOWN and event.key == RECORD_KEY:
+            if self.recording:
+                print('trace written to', self.stop_recording())
+            else:
+                self.start_recording()
+
+    def begin_frame(self):
+        if self.active:
+            self.restart_frame()
+
+    # measuring is switched on in the middle of a frame (key press) - the frame counts from here
+    # otherwise it would start at the begin_frame of the last time something was measured
+    def restart_frame(self):
+        self.phases = {}
+        self.frame_start = self.last_mark = perf_counter()
+
+    # book the time since the last mark onto a phase
+    def mark(self, phase):
+        if self.active:
+            now = perf_counter()
+            self.phases[phase] = self.phases.get(phase, 0) + now - self.last_mark
+            if self.recorder:
+                self.recorder.span(phase, self.last_mark, now)
+            self.last_mark = now
+
+    def end_frame(self):
+        if self.active:
+            now = perf_counter()
+            self.history.append((now - self.frame_start, self.phases))
+            if self.recorder:
+                self.recorder.span('frame', self.frame_start, now)
+
+    # average milliseconds per phase over the stored frames, in the order the phases happen
+    def phase_averages(self):
+        totals = {}
+        for _, phases in self.history:
+            for phase, seconds in phases.items():
+                totals[phase] = totals.get(phase, 0) + seconds
+        return {phase: seconds * 1000 / len(self.history) for phase, seconds in totals.items()}
+
+    # amount of frames in each bar of the histogram
+    def histogram(self):
+        bars = [0] * (len(HISTOGRAM_LIMITS) + 1)
+        for frame_time, _ in self.history:
+            milliseconds = frame_time * 1000
+            index = 0
+            while index < len(HISTOGRAM_LIMITS) and milliseconds > HISTOGRAM_LIMITS[index]:
+                index += 1
+            bars[index] += 1
+        return bars
+
+    def render(self, counts):
+        if not self.font:
+            self.font = pygame.font.Font(None, 20)
+        frame_times = [frame_time * 1000 for frame_time, _ in self.history]
+        average = sum(frame_times) / len(frame_times)
+        header = f'frame {average:.2f} ms   max {max(frame_times):.2f} ms   {1000 / average:.0f} fps'
+        # (name, value) - values are right aligned in a column, the default font is not monospaced
+        rows = [(phase, f'{milliseconds:.2f} ms') for phase, milliseconds in self.phase_averages().items()]
+        rows += [(name, str(count)) for name, count in counts.items()]
+
+        line_height = self.font.get_linesize()
+        bars = self.histogram()
+        bar_width = 36
+        width = 300
+        height = line_height * (len(rows) + 2) + 60
+        self.surface = pygame.Surface((width, height))
+        self.surface.set_alpha(200)
+        self.surface.fill('black')
+        self.surface.blit(self.font.render(header, False, 'white'), (6, 4))
+        for index, (name, value) in enumerate(rows, start=1):
+            y = 4 + index * line_height
+            self.surface.blit(self.font.render(name, False, 'white'), (6, y))
+            value_surf = self.font.render(value, False, 'white')
+            self.surface.blit(value_surf, value_surf.get_rect(topright=(width - 6, y)))
+
+        # frame time histogram - one bar per range, labelled with its upper limit
+        top = 4 + (len(rows) + 1) * line_height + 4
+        most = max(bars) or 1
+        for index, amount in enumerate(bars):
+            bar_height = 40 * amount / most
+            x = 6 + index * (bar_width + 6)
+            pygame.draw.rect(self.surface, 'orange', (x, top + 40 - bar_height, bar_width, bar_height))
+            label = f'{HISTOGRAM_LIMITS[index]:g}' if index < len(HISTOGRAM_LIMITS) else 'more'
+            self.surface.blit(self.font.render(label, False, 'white'), (x, top + 42))
+
+    # draw the overlay - counts: group name -> amount of sprites
+    # returns the window area it changed (covers the last overlay too, it can be larger than the new one)
+    def draw(self, surface, counts):
+        if not self.enabled or not self.history:
+            return None
+        self.frames_since_render += 1
+        if not self.surface or self.frames_since_render >= PROFILER_REFRESH:
+            self.render(counts)
+            self.frames_since_render = 0
+        rect = surface.blit(self.surface, (10, 10))
+        changed = rect.union(self.last_rect) if self.last_rect else rect
+        self.last_rect = rect
+        return changed
+
+    # window area the hidden overlay covered, only returned once (None afterwards)
+    # the frame below it is drawn again there, but with dirty rects it only reaches the display through this area
+    def hidden_rect(self):
+        rect, self.last_rect = self.last_rect, None
+        return rect
+
+
+profiler = Profiler()
@@ -0,0 +1,112 @@
+import pygame
+
+from settings import *
+
+
+# collects the screen areas that changed in a frame so only those have to be pushed to the window
+# areas of the previous frame are included too, otherwise moved objects would leave a trail
+class DirtyRects:
+    def __init__(self):
+        self.rects = []
+        self.previous_rects = []
+        # first frame always updates the whole window
+        self.full_update = True
+
+    def add(self, rect):
+        self.rects.append(rect)
+
+    def extend(self, rects):
+        self.rects.extend(rects)
+
+    # something changed everywhere (camera moved, editor input ...) -> update the whole window
+    def invalidate(self):
+        self.full_update = True
+
+    # returns the changed areas of this frame or None if the whole window has to be updated
+    def collect(self):
+        rects = None if self.full_update else self.previous_rects + self.rects
+        self.previous_rects = self.rects
+        self.rects = []
+        self.full_update = False
+        return rects
+
+
+# collects (surface, position) pairs and draws them with a single call instead of one blit per item
+# BATCHED_BLITS switches back to one blit call per item to compare both ways
+class BlitBatch:
+    def __init__(self, surface, dirty_rects=None):
+        self.surface = surface
+        # rectangles drawn to are only needed when the dirty rect mode is active
+        self.dirty_rects = dirty_rects if DIRTY_RECTS else None
+        self.blit_sequence = []
+        # fblits only exists in pygame-ce, it skips creating the returned rectangles
+        self.fast_blits = getattr(surface, 'fblits', None)
+        # amount of blits issued since the counter was reset
+        self.blit_count = 0
+
+    def add(self, surface, pos):
+        self.blit_sequence.append((surface, pos))
+
+    def flush(self):
+        blit_sequence = self.blit_sequence
+        if not blit_sequence:
+            return
+        self.blit_count += len(blit_sequence)
+        if BATCHED_BLITS:
+            if self.dirty_rects is not None:
+                self.dirty_rects.extend(self.surface.blits(blit_sequence))
+            elif self.fast_blits:
+                self.fast_blits(blit_sequence)
+            else:
+                self.surface.blits(blit_sequence, False)
+        else:
+            for surface, pos in blit_sequence:
+                rect = self.surface.blit(surface, pos)
+                if self.dirty_rects is not None:
+                    self.dirty_rects.add(rect)
+        self.blit_sequence = []
+
+
+# sky / horizon drawing shared by the editor and the level
+# the horizon band and the sea never change, so they are drawn once and only blitted at the horizon position
+class HorizonCache:
+    # horizon band reaches 20 pixels above the horizon line
+    band_height = 20
+
+    def __init__(self):
+        self.band_surface = None
+        self.sea_surface = None
+
+    # surfaces are created on first use - the display has to exist for that
+    def create_surfaces(self):
+        # 3 rectangles above the horizon, the gaps between them show what is behind (sky, clouds)
+        self.band_surface = pygame.Surface((WINDOW_WIDTH, self.band_height)).convert()
+        self.band_surface.fill('magenta')
+        self.band_surface.set_colorkey('magenta')
+        pygame.draw.rect(self.band_surface, HORIZON_TOP_COLOR, (0, self.band_height - 10, WINDOW_WIDTH, 10))
+        pygame.draw.rect(self.band_surface, HORIZON_TOP_COLOR, (0, self.band_height - 16, WINDOW_WIDTH, 4))
+        pygame.draw.rect(self.band_surface, HORIZON_TOP_COLOR, (0, self.band_height - 20, WINDOW_WIDTH, 2))
+
+        # sea below the horizon with the horizon line on top (3 pixel line starts 1 pixel above the horizon)
+        self.sea_surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT + 2)).convert()
+        self.sea_surface.fill(SEA_COLOR)
+        pygame.draw.line(self.sea_surface, HORIZON_COLOR, (0, 1), (WINDOW_WIDTH, 1), 3)
+
+    # rectangles above the horizon
+    def draw_band(self, surface, horizon_y):
+        if not self.band_surface:
+            self.create_surfaces()
+        surface.blit(self.band_surface, (0, horizon_y - self.band_height))
+
+    # horizon line and the sea down to the bottom of the window
+    def draw_sea(self, surface, horizon_y):
+        if not self.sea_surface:
+            self.create_surfaces()
+        surface.blit(self.sea_surface, (0, horizon_y - 1))
+
+    # horizon is above the window - only sea is visible
+    def draw_underwater(self, surface):
+        surface.fill(SEA_COLOR)
+
+
+horizon_cache = HorizonCache()
@@ -3,6 +3,70 @@ TILE_SIZE = 64
 WINDOW_WIDTH = 1280
 WINDOW_HEIGHT = 720
 ANIMATION_SPEED = 8
+# start identical animated level tiles (palms, coins) at random frames
+ANIMATION_PHASE_OFFSETS = False
+
+# graphics
+GRAPHICS_FOLDER = '../graphics'
+# all graphics pre-decoded in one file (built with python bundle.py) - loaded instead of the single images
+BUNDLE_PATH = '../graphics.bundle'
+USE_ASSET_BUNDLE = True
+
+# rendering
+# size of the cells the camera uses to find sprites on screen
+CAMERA_CELL_SIZE = TILE_SIZE * 4
+# extra space around the window that is still drawn so sprites do not pop in at the edges
+CULL_MARGIN = TILE_SIZE * 2
+# static tiles are pre-rendered into chunks of CHUNK_SIZE x CHUNK_SIZE tiles
+CHUNK_SIZE = 16
+# only push changed areas of the window to the display (helps on software rendered displays)
+DIRTY_RECTS = False
+# submit all blits of a layer with one Surface.blits call instead of one blit call per sprite
+BATCHED_BLITS = True
+
+# frame pacing
+# frames per second the main loop is limited to (0 -> no limit)
+TARGET_FPS = 120
+# wait for the display refresh before showing a frame (needs a scaled window)
+VSYNC = False
+# editor without input slows down after IDLE_DELAY seconds
+IDLE_THROTTLING = True
+IDLE_DELAY = 2
+IDLE_FPS = 10
+# idle editor sleeps until an event arrives instead of running at IDLE_FPS
+# clouds and animations still move every IDLE_WAIT_TIMEOUT milliseconds
+IDLE_WAIT_EVENTS = False
+IDLE_WAIT_TIMEOUT = 500
+
+# profiler overlay (toggled with F3)
+# frames the timings are averaged over, frames between two updates of the overlay
+PROFILER_HISTORY = 240
+PROFILER_REFRESH = 15
+# frame trace recording (toggled with F4) - written to TRACE_FOLDER when the recording stops
+# 'chrome' (trace event format) or 'jsonl' (one event per line)
+TRACE_FORMAT = 'chrome'
+TRACE_FOLDER = '../traces'
+# newest events kept in memory - older ones are dropped
+TRACE_BUFFER_SIZE = 500000
+
+# simulation
+# level physics run in fixed steps of 1 / SIMULATION_TICK_RATE seconds, independent of the frame rate
+FIXED_TIMESTEP = True
+SIMULATION_TICK_RATE = 60
+SIMULATION_STEP = 1 / SIMULATION_TICK_RATE
+# longest frame time that is simulated - longer frames (window dragged ...) slow the game down instead
+MAX_FRAME_TIME = 0.25
+# draw moving sprites between their last two simulated positions
+RENDER_INTERPOLATION = True
+# only update sprites near the player, sprites further away sleep and catch up when they wake up
+SIMULATION_LOD = True
+# extra space around the window in which sprites are still updated
+SIMULATION_MARGIN = TILE_SIZE * 8
+# sleeping sprites all catch up every SLEEP_UPDATE_INTERVAL seconds (0 -> only when they wake up)
+SLEEP_UPDATE_INTERVAL = 0
+# catching up is done in steps of at most SLEEP_CATCH_UP_STEP seconds, for at most SLEEP_MAX_CATCH_UP seconds
+SLEEP_CATCH_UP_STEP = 1 / 30
+SLEEP_MAX_CATCH_UP = 2
 
 # editor graphics / number is index / objects in collection
 EDITOR_DATA = {
@@ -69,6 +133,12 @@ LEVEL_LAYERS = {
     'main': 5
 }
 
+# clouds
+# one level cloud per LEVEL_CLOUD_SPACING pixels of level width, but at least LEVEL_CLOUD_MIN
+LEVEL_CLOUD_SPACING = 200
+LEVEL_CLOUD_MIN = 10
+EDITOR_CLOUD_COUNT = 20
+
 # colors
 SKY_COLOR = '#ddc6a1'
 SEA_COLOR = '#92a9ce'
@@ -0,0 +1,121 @@
+import pygame
+
+from settings import *
+
+
+# uniform grid that stores objects by the cells their rectangle touches
+# used to only look at objects near a given area instead of checking all of them
+class SpatialHash:
+    def __init__(self, cell_size=TILE_SIZE):
+        self.cell_size = cell_size
+        # cell (col, row) -> set of objects touching that cell
+        self.cells = {}
+        # object -> cell range (left, top, right, bottom) it is currently stored in
+        self.entries = {}
+
+    # get the range of cells a rectangle touches
+    def cell_range(self, rect):
+        size = self.cell_size
+        # make sure empty rectangles still occupy the cell they are placed in
+        right = max(rect.right - 1, rect.left)
+        bottom = max(rect.bottom - 1, rect.top)
+        return rect.left // size, rect.top // size, right // size, bottom // size
+
+    def insert(self, item, rect):
+        # an object is only stored in one place
+        if item in self.entries:
+            self.remove(item)
+        cell_range = self.cell_range(rect)
+        self.entries[item] = cell_range
+        left, top, right, bottom = cell_range
+        for col in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                self.cells.setdefault((col, row), set()).add(item)
+
+    def remove(self, item):
+        cell_range = self.entries.pop(item, None)
+        if cell_range is None:
+            return
+        left, top, right, bottom = cell_range
+        for col in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                cell = self.cells[(col, row)]
+                cell.discard(item)
+                # drop empty cells so the dictionary does not grow with every visited cell
+                if not cell:
+                    del self.cells[(col, row)]
+
+    # re-bucket an object after it moved - only touches the cells when the cell range changed
+    def move(self, item, rect):
+        if self.entries.get(item) != self.cell_range(rect):
+            self.remove(item)
+            self.insert(item, rect)
+
+    # all objects stored in the cells a rectangle touches (candidates, not exact overlaps)
+    def query(self, rect):
+        found = set()
+        left, top, right, bottom = self.cell_range(rect)
+        cells = self.cells
+        for col in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                cell = cells.get((col, row))
+                if cell:
+                    found.update(cell)
+        return found
+
+    def __contains__(self, item):
+        return item in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# sprite group backed by a spatial hash - answers which sprites are near an area without checking all of them
+# sprites with the class attribute moving = True are re-bucketed by refresh()
+class SpatialGroup(pygame.sprite.Group):
+    def __init__(self, cell_size=TILE_SIZE):
+        super().__init__()
+        self.spatial_hash = SpatialHash(cell_size)
+        # sprite -> number in which it was added, results keep the order of the group
+        self.order = {}
+        self.added_count = 0
+        # rect of a sprite is set after it joined its groups, so new sprites are stored on the next query
+        self.new_sprites = []
+        self.moving_sprites = set()
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.order[sprite] = self.added_count
+        self.added_count += 1
+        self.new_sprites.append(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        del self.order[sprite]
+        self.spatial_hash.remove(sprite)
+        self.moving_sprites.discard(sprite)
+
+    # store new sprites and move the ones that changed their position
+    def refresh(self):
+        self.store_new_sprites()
+        for sprite in self.moving_sprites:
+            self.spatial_hash.move(sprite, sprite.rect)
+
+    def store_new_sprites(self):
+        for sprite in self.new_sprites:
+            # sprite could already be killed again
+            if sprite in self.order:
+                self.spatial_hash.insert(sprite, sprite.rect)
+                if getattr(sprite, 'moving', False):
+                    self.moving_sprites.add(sprite)
+        self.new_sprites = []
+
+    # sprites in the cells around an area (might not overlap it) in the order of the group
+    def nearby(self, rect):
+        if self.new_sprites:
+            self.store_new_sprites()
+        return sorted(self.spatial_hash.query(rect), key=self.order.__getitem__)
+
+    # sprites whose rect overlaps an area in the order of the group
+    def overlapping(self, rect):
+        return [sprite for sprite in self.nearby(rect) if sprite.rect.colliderect(rect)]
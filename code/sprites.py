@@ -4,12 +4,18 @@ from pygame.math import Vector2 as vector
 
 from settings import *
 from timer import Timer
-from random import choice, randint
+from support import get_mask, get_flash_surface, get_flipped_assets
+from random import choice
 
 
 # parameter = inheritance
 # acts as a super class for all sprite objects
 class Generic(pygame.sprite.Sprite):
+    # sprites that change their position after creation - camera has to re-check where they are every frame
+    moving = False
+    # sprites that are updated even far away from the camera
+    always_active = False
+
     def __init__(self, pos, surf, group, z=LEVEL_LAYERS['main']):
         # call super constructor for super class
         super().__init__(group)
@@ -29,39 +35,100 @@ class Block(Generic):
         super().__init__(pos, surf, group)
 
 
-# Clouds
-class Cloud(Generic):
-    def __init__(self, pos, surf, group, left_limit):
-        super().__init__(pos, surf, group, LEVEL_LAYERS['clouds'])
-        # kill clouds when outside level
-        self.left_limit = left_limit
+# invisible rectangle covering several terrain tiles - only used for collision, never drawn
+class TerrainCollider(pygame.sprite.Sprite):
+    def __init__(self, rect, group):
+        super().__init__(group)
+        self.rect = rect
+
+
+# POOLS
+# keeps killed sprites of one class and hands them out again instead of creating new ones
+# pooled classes need a reset method taking the same arguments as their constructor
+class SpritePool:
+    def __init__(self, sprite_class):
+        self.sprite_class = sprite_class
+        self.free_sprites = []
+        # counters for tuning - reused sprites vs newly created ones
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, *args):
+        if self.free_sprites:
+            self.hits += 1
+            sprite = self.free_sprites.pop()
+            sprite.reset(*args)
+        else:
+            self.misses += 1
+            sprite = self.sprite_class(*args)
+            sprite.pool = self
+        return sprite
 
-        # movement
-        self.pos = vector(self.rect.topleft)
-        # different movement speed
-        self.speed = randint(20, 30)
+    def release(self, sprite):
+        self.free_sprites.append(sprite)
 
-    def update(self, dt):
-        # clouds always move to the left
-        self.pos.x -= self.speed * dt
-        self.rect.x = round(self.pos.x)
-        # destroy cloud outside level limits
-        if self.rect.x <= self.left_limit:
-            self.kill()
+
+# sprites that go back to their pool when they are killed
+class Pooled:
+    pool = None
+
+    def kill(self):
+        # only return once - a sprite can be killed more than once
+        was_alive = self.alive()
+        super().kill()
+        if self.pool and was_alive:
+            self.pool.release(self)
 
 
 # ANIMATIONS
+# frame index shared by all sprites showing the same animation (like Editor.animations)
+# updated once per frame instead of once per sprite
+class AnimationClock:
+    def __init__(self, length):
+        self.length = length
+        self.frame_index = 0
+
+    def update(self, dt):
+        self.frame_index += ANIMATION_SPEED * dt
+        self.frame_index = 0 if self.frame_index >= self.length else self.frame_index
+
+
+# one clock per animation frame list
+class AnimationClocks:
+    def __init__(self):
+        # id of frame list -> clock
+        self.clocks = {}
+
+    # get the clock for a list of frames, create it on first use
+    def get(self, frames):
+        if id(frames) not in self.clocks:
+            self.clocks[id(frames)] = AnimationClock(len(frames))
+        return self.clocks[id(frames)]
+
+    def update(self, dt):
+        for clock in self.clocks.values():
+            clock.update(dt)
+
+
 # represents animated objects -> water - subclass of Generic
 class Animated(Generic):
-    def __init__(self, assets, pos, group, z=LEVEL_LAYERS['main']):
+    # clock - shared frame index, without one the sprite animates on its own
+    # phase - offset in frames to the shared clock so identical tiles do not move in sync
+    def __init__(self, assets, pos, group, z=LEVEL_LAYERS['main'], clock=None, phase=0):
         # create a list of surfaces
         self.animation_frames = assets
         # used to pick 1 surf from assets list
         self.frame_index = 0
+        self.clock = clock
+        self.phase = phase
         super().__init__(pos, self.animation_frames[self.frame_index], group, z)
 
     # animate tiles
     def animate(self, dt):
+        # read the frame from the shared clock
+        if self.clock:
+            self.image = self.animation_frames[int(self.clock.frame_index + self.phase) % self.clock.length]
+            return
         # increase index for using different tiles in animation
         self.frame_index += ANIMATION_SPEED * dt
         self.frame_index = 0 if self.frame_index >= len(self.animation_frames) else self.frame_index
@@ -73,12 +140,20 @@ class Animated(Generic):
 
 
 # represents the particle objects
-class Particle(Animated):
+class Particle(Pooled, Animated):
     def __init__(self, assets, pos, group):
         super().__init__(assets, pos, group)
         # align particle and coin pos to center
         self.rect = self.image.get_rect(center=pos)
 
+    # start the animation again at a new position (reused from a pool)
+    def reset(self, assets, pos, group):
+        self.animation_frames = assets
+        self.frame_index = 0
+        self.image = self.animation_frames[self.frame_index]
+        self.rect = self.image.get_rect(center=pos)
+        self.add(group)
+
     # overwrite animate method for this object due to particle should be animated only once
     def animate(self, dt):
         # increase index for using different tiles in animation
@@ -92,8 +167,8 @@ class Particle(Animated):
 
 # represents the coin objects
 class Coin(Animated):
-    def __init__(self, coin_type, assets, pos, group):
-        super().__init__(assets, pos, group)
+    def __init__(self, coin_type, assets, pos, group, clock=None, phase=0):
+        super().__init__(assets, pos, group, clock=clock, phase=phase)
         # center all images inside the cells
         self.rect = self.image.get_rect(center=pos)
         self.coin_type = coin_type
@@ -104,11 +179,13 @@ class Spikes(Generic):
     def __init__(self, surf, pos, group):
         super().__init__(pos, surf, group)
         # create a mask for proper collision
-        self.mask = pygame.mask.from_surface(self.image)
+        self.mask = get_mask(self.image)
 
 
 class Tooth(Generic):
-    def __init__(self, assets, pos, group, collision_sprites):
+    moving = True
+
+    def __init__(self, assets, pos, group, solid_map):
         # general setup
         self.animation_frames = assets
         self.frame_index = 0
@@ -118,7 +195,7 @@ class Tooth(Generic):
         # relocate sprite to set it in correct place in cell (without gap)
         self.rect.bottom = self.rect.top + TILE_SIZE
         # create a mask for proper collision
-        self.mask = pygame.mask.from_surface(self.image)
+        self.mask = get_mask(self.image)
 
         # movement
         # choice randomize starting left or right side direction
@@ -127,12 +204,12 @@ class Tooth(Generic):
         self.orientation = 'left' if self.direction.x < 0 else 'right'
         self.pos = vector(self.rect.topleft)
         self.speed = 120
-        self.collision_sprites = collision_sprites
+        # occupancy grid of the level for ground and wall checks
+        self.solid_map = solid_map
 
-        # destroy tooth at start when not on floor using collection comparison
-        # check if any point collides below the player - object - if not list is empty
-        if not [sprite for sprite in collision_sprites
-                if sprite.rect.collidepoint(self.rect.midbottom + vector(0, 10))]:
+        # destroy tooth at start when not on floor
+        # check if the point below the tooth is solid
+        if not self.solid_map.is_solid(self.rect.midbottom + vector(0, 10)):
             self.kill()
 
     def animate(self, dt):
@@ -140,8 +217,8 @@ class Tooth(Generic):
         self.frame_index += ANIMATION_SPEED * dt
         self.frame_index = 0 if self.frame_index >= len(current_animation) else self.frame_index
         self.image = current_animation[int(self.frame_index)]
-        # as the image changes when animation occurs a new mask is needed every time
-        self.mask = pygame.mask.from_surface(self.image)
+        # as the image changes when animation occurs a new mask is needed every time (taken from the cache)
+        self.mask = get_mask(self.image)
 
     def move(self, dt):
         # create indicator blocks to change direction when collision happens or no more ground is left
@@ -157,26 +234,14 @@ class Tooth(Generic):
         # moving right
         if self.direction.x > 0:
             # check for collisions
-            # floor collision
-            floor_sprites = [sprite for sprite in self.collision_sprites
-                             if sprite.rect.collidepoint(right_gap)]
-            # wall collision
-            wall_sprites = [sprite for sprite in self.collision_sprites
-                            if sprite.rect.collidepoint(right_block)]
-            # a collision happened or no floor - change direction
-            if wall_sprites or not floor_sprites:
+            # a wall or no floor - change direction
+            if self.solid_map.is_solid(right_block) or not self.solid_map.is_solid(right_gap):
                 self.direction.x *= -1
                 self.orientation = 'left'
         # moving left
         if self.direction.x < 0:
-            # floor collision
-            floor_sprites = [sprite for sprite in self.collision_sprites
-                             if sprite.rect.collidepoint(left_gap)]
-            # wall collision
-            wall_sprites = [sprite for sprite in self.collision_sprites
-                            if sprite.rect.collidepoint(left_block)]
-            # a collision happened or no floor - change direction
-            if wall_sprites or not floor_sprites:
+            # a wall or no floor - change direction
+            if self.solid_map.is_solid(left_block) or not self.solid_map.is_solid(left_gap):
                 self.direction.x *= -1
                 self.orientation = 'right'
 
@@ -189,16 +254,10 @@ class Tooth(Generic):
 
 
 class Shell(Generic):
-    def __init__(self, orientation, assets, pos, group, pearl_surf, damage_sprites):
+    def __init__(self, orientation, assets, pos, group, pearl_surf, damage_sprites, pearl_pool):
         self.orientation = orientation
-        # to use both directions of shell use assets.copy
-        # otherwise shell will point in the same direction as last one
-        self.animation_frames = assets.copy()
-        # check if to flip animation
-        if orientation == 'right':
-            for key, value in self.animation_frames.items():
-                # overwrite keys with flipped sprites
-                self.animation_frames[key] = [pygame.transform.flip(surf, True, False) for surf in value]
+        # shells pointing right use flipped frames - flipped once and shared by all right shells
+        self.animation_frames = get_flipped_assets(assets) if orientation == 'right' else assets
 
         self.frame_index = 0
         self.status = 'idle'
@@ -211,6 +270,11 @@ class Shell(Generic):
         self.has_shot = False
         self.attack_cooldown = Timer(2000)
         self.damage_sprites = damage_sprites
+        # pearls are reused once they are destroyed
+        self.pearl_pool = pearl_pool
+        # pearls join the first group of the shell (camera group)
+        # groups() has no fixed order, so the group is kept here
+        self.pearl_group = group[0]
 
     def animate(self, dt):
         current_animation = self.animation_frames[self.status]
@@ -228,8 +292,8 @@ class Shell(Generic):
             # create a pearl that needs an offset to not "rolL" on floor
             offset = (pearl_direction * 50) + vector(0, -10) if self.orientation == 'left' \
                 else (pearl_direction * 20 + vector(0, -10))
-            Pearl((self.rect.center + offset), pearl_direction, self.pearl_surf,
-                  [self.groups()[0], self.damage_sprites])
+            self.pearl_pool.get((self.rect.center + offset), pearl_direction, self.pearl_surf,
+                                [self.pearl_group, self.damage_sprites])
             self.has_shot = True
 
     def get_status(self):
@@ -248,11 +312,16 @@ class Shell(Generic):
 
 
 # represents the pearl which is shot by shells
-class Pearl(Generic):
+class Pearl(Pooled, Generic):
+    moving = True
+    # a pearl only lives 6 seconds - it has to keep its timer running when it flies out of the active area,
+    # otherwise it is never killed and does not go back to the pool
+    always_active = True
+
     def __init__(self, pos, direction, surf, group):
         super().__init__(pos, surf, group)
         # create a mask for proper collision
-        self.mask = pygame.mask.from_surface(self.image)
+        self.mask = get_mask(self.image)
 
         # movement
         self.pos = vector(self.rect.topleft)
@@ -263,6 +332,16 @@ class Pearl(Generic):
         self.timer = Timer(6000)
         self.timer.activate()
 
+    # shoot the pearl again from a new position (reused from a pool)
+    def reset(self, pos, direction, surf, group):
+        self.image = surf
+        self.mask = get_mask(self.image)
+        self.rect = self.image.get_rect(topleft=pos)
+        self.pos = vector(self.rect.topleft)
+        self.direction = direction
+        self.timer.activate()
+        self.add(group)
+
     def update(self, dt):
         # movement
         self.pos.x += self.direction.x * self.speed * dt
@@ -275,7 +354,11 @@ class Pearl(Generic):
 
 # represents the player object - subclass of Generic
 class Player(Generic):
-    def __init__(self, pos, assets, group, collision_sprites):
+    moving = True
+    always_active = True
+
+    # key_source - function returning the pressed keys like pygame.key.get_pressed (scripted input)
+    def __init__(self, pos, assets, group, collision_sprites, solid_map, key_source=None):
         # animation - logic
         self.animation_frames = assets
         self.frame_index = 0
@@ -286,7 +369,7 @@ class Player(Generic):
 
         super().__init__(pos, surf, group)
         # create a mask for proper collision
-        self.mask = pygame.mask.from_surface(self.image)
+        self.mask = get_mask(self.image)
 
         # store movement of the player
         # store the direction from the player as a vector
@@ -302,16 +385,22 @@ class Player(Generic):
 
         # collision section
         self.collision_sprites = collision_sprites
+        self.collision_candidates = 0
+        # occupancy grid of the level for the floor check
+        self.solid_map = solid_map
         # player hit box
         self.hitbox = self.rect.inflate(-50, 0)
 
         # timer make sure damage occurrence is limited
         self.invul_timer = Timer(200)
 
+        # keyboard when there is no key source
+        self.key_source = key_source
+
     # check player related input
     def input(self):
         # get all pressed keys
-        keys = pygame.key.get_pressed()
+        keys = self.key_source() if self.key_source else pygame.key.get_pressed()
         if keys[pygame.K_RIGHT]:
             # right was pressed move on x-axis
             self.direction.x = 1
@@ -370,17 +459,13 @@ class Player(Generic):
         self.frame_index += ANIMATION_SPEED * dt
         self.frame_index = 0 if self.frame_index >= len(current_animation) else self.frame_index
         self.image = current_animation[int(self.frame_index)]
-        # every animation image changes, a new mask is needed for that
-        self.mask = pygame.mask.from_surface(self.image)
+        # every animation image changes, a new mask is needed for that (taken from the cache)
+        self.mask = get_mask(self.image)
 
         # player was damaged -> make it visible by flashing in a color
         if self.invul_timer.active:
-            # transform mask to a new surface
-            surf = self.mask.to_surface()
-            # get rid of black inside the surface
-            surf.set_colorkey('black')
-            # use this mask as new image
-            self.image = surf
+            # use the white version of the frame created when the assets were imported
+            self.image = get_flash_surface(self.image)
 
     def move(self, dt):
         # horizontal movement
@@ -404,13 +489,15 @@ class Player(Generic):
     # (otherwise air jumps are possible)
     def check_on_floor(self):
         floor_rect = pygame.Rect(self.hitbox.bottomleft, (self.hitbox.width, 2))
-        floor_sprites = [sprite for sprite in self.collision_sprites if sprite.rect.colliderect(floor_rect)]
-        self.on_floor = True if floor_sprites else False
+        self.on_floor = self.solid_map.overlaps_solid(floor_rect)
 
     # collision
     def collision(self, direction):
-        # check all possible sprites to collide with
-        for sprite in self.collision_sprites:
+        # check all sprites around the hit box - the hit box moves while resolving, so look a bit further
+        candidates = self.collision_sprites.nearby(self.hitbox.inflate(TILE_SIZE, TILE_SIZE))
+        # amount of sprites checked in the last collision call (frame trace)
+        self.collision_candidates = len(candidates)
+        for sprite in candidates:
             # check if player hit box collide with sprite
             if sprite.rect.colliderect(self.hitbox):
                 if direction == 'horizontal':
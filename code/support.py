@@ -1,22 +1,39 @@
 import pygame
 from os import walk
 
+from bundle import asset_bundle
+
+
+# load a single image - taken from the asset bundle if there is one, otherwise decoded from its file
+def load_image(path):
+    if asset_bundle:
+        surface = asset_bundle.image(path)
+        if surface:
+            return surface
+    return pygame.image.load(path)
+
+
+# names of the images in a folder (and its sub folders) in the order walk lists them
+def folder_images(path):
+    names = asset_bundle.folder(path) if asset_bundle else None
+    if names is None:
+        names = [image_name for _, _, img_files in walk(path) for image_name in img_files]
+    return names
+
 
 # cycle through the folder and add all data to a list
 def import_folder(path):
     # list -> []
     surface_list = []
 
-    # list contains of 3 key elements, go through all of them
-    for folder_name, sub_folders, img_files in walk(path):
-        # first attribute
-        for image_name in img_files:
-            # construct a destination path for the image
-            full_path = path + '/' + image_name
-            # use the path to store the image as surface
-            image_surface = pygame.image.load(full_path).convert_alpha()
-            # add image surface to surface list
-            surface_list.append(image_surface)
+    # all images of the folder - from the bundle or the folder itself
+    for image_name in folder_images(path):
+        # construct a destination path for the image
+        full_path = path + '/' + image_name
+        # use the path to store the image as surface
+        image_surface = load_image(full_path).convert_alpha()
+        # add image surface to surface list
+        surface_list.append(image_surface)
 
     return surface_list
 
@@ -25,15 +42,72 @@ def import_folder_dict(path):
     # dictionary -> {}
     surface_dict = {}
 
-    # list contains of 3 key elements, go through all of them
-    for folder_name, sub_folders, img_files in walk(path):
-        # first attribute
-        for image_name in img_files:
-            # construct a destination path for the image
-            full_path = path + '/' + image_name
-            # use the path to store the image as surface
-            image_surface = pygame.image.load(full_path).convert_alpha()
-            # separate filename from ending
-            surface_dict[image_name.split('.')[0]] = image_surface
+    # all images of the folder - from the bundle or the folder itself
+    for image_name in folder_images(path):
+        # construct a destination path for the image
+        full_path = path + '/' + image_name
+        # use the path to store the image as surface
+        image_surface = load_image(full_path).convert_alpha()
+        # separate filename from ending
+        surface_dict[image_name.split('.')[0]] = image_surface
 
     return surface_dict
+
+
+# collision masks of imported surfaces - surface -> mask
+# masks are created once when the assets are imported instead of every frame in the sprites
+mask_cache = {}
+
+
+def get_mask(surface):
+    mask = mask_cache.get(surface)
+    if mask is None:
+        mask = mask_cache[surface] = pygame.mask.from_surface(surface)
+    return mask
+
+
+# create masks for a surface, a list of surfaces or a dictionary of surface lists
+def cache_masks(assets):
+    if isinstance(assets, dict):
+        for value in assets.values():
+            cache_masks(value)
+    elif isinstance(assets, list):
+        for surface in assets:
+            get_mask(surface)
+    else:
+        get_mask(assets)
+
+
+# white silhouettes of imported surfaces used as hit flash - surface -> flash surface
+flash_cache = {}
+
+
+def get_flash_surface(surface):
+    flash_surface = flash_cache.get(surface)
+    if flash_surface is None:
+        # transform mask to a new surface and get rid of the black inside of it
+        flash_surface = get_mask(surface).to_surface()
+        flash_surface.set_colorkey('black')
+        flash_cache[surface] = flash_surface
+    return flash_surface
+
+
+# create flash surfaces for a dictionary of surface lists
+def cache_flash_surfaces(assets):
+    for surfaces in assets.values():
+        for surface in surfaces:
+            get_flash_surface(surface)
+
+
+# mirrored versions of asset dictionaries shared by all sprites using them
+# (id of assets, flip x, flip y) -> (assets, flipped assets) - original is kept so its id stays unique
+flipped_cache = {}
+
+
+def get_flipped_assets(assets, flip_x=True, flip_y=False):
+    key = (id(assets), flip_x, flip_y)
+    if key not in flipped_cache:
+        flipped_assets = {name: [pygame.transform.flip(surface, flip_x, flip_y) for surface in surfaces]
+                          for name, surfaces in assets.items()}
+        flipped_cache[key] = (assets, flipped_assets)
+    return flipped_cache[key][1]
@@ -1,5 +1,8 @@
 import pygame
 
+# function returning the current time in milliseconds - headless runs use the simulated time instead
+time_source = pygame.time.get_ticks
+
 
 class Timer:
     def __init__(self, duration):
@@ -10,7 +13,7 @@ class Timer:
     def activate(self):
         self.active = True
         # gets the current time once when timer is started
-        self.start_time = pygame.time.get_ticks()
+        self.start_time = time_source()
 
     def deactivate(self):
         self.active = False
@@ -18,7 +21,7 @@ class Timer:
 
     def update(self):
         # gets the current time constantly
-        current_time = pygame.time.get_ticks()
+        current_time = time_source()
         # timer runs till duration ends, is deactivated afterwards
         if current_time - self.start_time >= self.duration:
             self.deactivate()